@@ -1,108 +1,73 @@
-import re
+import itertools
 import random
-import os
-import json
-from typing import Union
 from . import leetcode_client
+from . import metrics
 from .data_manager import DataManager
+from .snapshot import UserSnapshot
 
-CACHE_DIR = "/tmp/cache"
+# Difficulties of the practice problems suggested for a topic gap
+SUGGESTED_DIFFICULTIES = ("Easy", "Medium")
 
-def _get_cache_path(username: str) -> str:
-    # In a serverless environment, it's better to ensure the directory exists
-    # just before you need it.
-    os.makedirs(CACHE_DIR, exist_ok=True)
-    return os.path.join(CACHE_DIR, f"{username}_data.json")
-
-def _read_cache(username: str) -> Union[dict, None]:
-    cache_path = _get_cache_path(username)
-    if os.path.exists(cache_path):
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    return None
-
-def _write_cache(username: str, data: dict):
-    cache_path = _get_cache_path(username)
-    with open(cache_path, 'w') as f:
-        json.dump(data, f)
-
-def _create_slug(title: str) -> str:
-    return re.sub(r'\W+', '-', title.lower()).strip('-')
-
-def analyze_topic_gaps(username: str, data_manager: DataManager, leetcode_session: str = None) -> dict:
+@metrics.timed("analyzer.topic_gaps")
+async def analyze_topic_gaps(snapshot: UserSnapshot, data_manager: DataManager) -> dict:
+    username = snapshot.username
+    leetcode_session = snapshot.leetcode_session
     solved_slugs = set()
     
     # Determine solved slugs based on session availability
     if leetcode_session:
-        cached_data = _read_cache(username)
-        current_submission_count = leetcode_client.get_user_submission_count(username)
-
-        if cached_data and cached_data.get("submission_count") == current_submission_count:
-            print(f"Using cached data for {username}")
-            solved_slugs = set(cached_data["solved_slugs"])
-        else:
-            print(f"Fetching fresh data for {username}")
-            try:
-                solved_titles = leetcode_client.get_solved_questions(username, leetcode_session)
-                if solved_titles:
-                    solved_slugs = {_create_slug(title) for title in solved_titles}
-                    _write_cache(username, {"submission_count": current_submission_count, "solved_slugs": list(solved_slugs)})
-            except Exception as e:
-                return {"error": f"Could not fetch solved questions: {e}"}
+        try:
+            # Served from the user cache when available.
+            solved_slugs = set(await leetcode_client.get_solved_questions(username, leetcode_session, get_profile=snapshot.profile))
+        except Exception as e:
+            return {"error": f"Could not fetch solved questions: {e}"}
     
+    # Get all user submissions to calculate nemesis problems
+    submission_counts = await snapshot.submission_counts()
+    if not submission_counts:
+        return {"error": "Could not fetch user submissions."}
+
     # Fallback or default to public submissions if no session or fresh data fetch fails
     if not solved_slugs:
-        user_submissions = leetcode_client.get_user_submissions(username, limit=1000)
-        if not user_submissions:
-            return {"error": "Could not fetch user submissions."}
-        solved_slugs = {_create_slug(sub['title']) for sub in user_submissions if sub['statusDisplay'] == 'Accepted'}
-
-    # Get all user submissions to calculate nemesis problems
-    all_submissions = leetcode_client.get_user_submissions(username, limit=1000)
-    if not all_submissions:
-        return {"error": "Could not fetch user submissions for nemesis calculation."}
-
-    submission_counts = {}
-    for sub in all_submissions:
-        slug = _create_slug(sub['title'])
-        if slug not in submission_counts:
-            submission_counts[slug] = {'accepted': False, 'attempts': 0}
-        submission_counts[slug]['attempts'] += 1
-        if sub['statusDisplay'] == 'Accepted':
-            submission_counts[slug]['accepted'] = True
+        solved_slugs = await snapshot.accepted_slugs()
     
     nemesis_slugs = {slug for slug, data in submission_counts.items() if data['attempts'] > 1 and not data['accepted']}
 
-    # Calculate topic gaps
-    solved_topics = set()
-    for slug in solved_slugs:
-        question = data_manager.get_question_by_slug(slug)
-        if question:
-            for tag in question.get("topicTags", []):
-                solved_topics.add(tag['name'])
-
-    all_topics = set(data_manager.questions_by_topic.keys())
-    unsolved_topics = all_topics - solved_topics
-
+    # Work on question ids from here on: a topic is a gap when its bitset shares
+    # no question with the solved set.
+    solved_ids = data_manager.get_question_ids(solved_slugs)
+    excluded_ids = solved_ids | data_manager.get_question_ids(nemesis_slugs)
+    solved_bits = 0
+    for question_id in solved_ids:
+        solved_bits |= 1 << question_id
+    unsolved_topics = [topic for topic, bits in data_manager.topic_bitsets.items() if not bits & solved_bits]
+
+    rng = await snapshot.rng("topic_gaps")
+    # Sorted for determinism, then shuffled with the seeded rng so every unsolved
+    # topic can be picked, not just the alphabetically first ones.
+    unsolved_topics.sort()
+    rng.shuffle(unsolved_topics)
     topic_gaps = {}
     for topic in unsolved_topics:
-        questions = data_manager.get_questions_by_topic(topic)
+        if len(topic_gaps) == 5:
+            break
         # Suggesting 5 easy or medium problems for each topic gap 
-        suggestions = []
-        for q in questions:
-            if q and 'difficulty' in q and q['difficulty'] in ['Easy', 'Medium'] and 'title' in q:
-                slug = _create_slug(q['title'])
-                if slug not in solved_slugs and slug not in nemesis_slugs:
-                    suggestions.append(slug)
+        suggestions = [
+            question_id
+            for difficulty in SUGGESTED_DIFFICULTIES
+            for question_id in data_manager.get_topic_candidates(topic, difficulty)
+            if question_id not in excluded_ids
+        ]
         
-        random.shuffle(suggestions)
+        rng.shuffle(suggestions)
         if suggestions:
-            topic_gaps[topic] = suggestions[:5]
+            topic_gaps[topic] = [data_manager.questions[question_id].slug for question_id in suggestions[:5]]
 
-    return dict(list(topic_gaps.items())[:5])
+    return topic_gaps
 
-def analyze_unsolved_contest_problems(username: str, data_manager: DataManager) -> dict:
-    contest_history = leetcode_client.get_user_contest_history(username)
+@metrics.timed("analyzer.unsolved_contest_problems")
+async def analyze_unsolved_contest_problems(snapshot: UserSnapshot, data_manager: DataManager) -> dict:
+    contest_history = await snapshot.contest_history()
     if not contest_history or 'userContestRankingHistory' not in contest_history:
         return {"error": "Could not fetch contest history."}
 
@@ -114,23 +79,15 @@ def analyze_unsolved_contest_problems(username: str, data_manager: DataManager)
     
     return {"unsolved_contests": unsolved_problems[:5]} # Return top 5
 
-def find_nemesis_problems(username: str, data_manager: DataManager, leetcode_session: str = None) -> dict:
+@metrics.timed("analyzer.nemesis_problems")
+async def find_nemesis_problems(snapshot: UserSnapshot, data_manager: DataManager) -> dict:
     # This function analyzes recent submissions to find problems that were attempted
     # multiple times. It does not require a full list of solved problems, so the
     # session-based fetching logic was removed to simplify and avoid confusion.
-    submissions = leetcode_client.get_user_submissions(username, limit=1000)
-    if not submissions:
+    submission_counts = await snapshot.submission_counts()
+    if not submission_counts:
         return {"error": "Could not fetch user submissions for nemesis analysis."}
 
-    submission_counts = {}
-    for sub in submissions:
-        slug = _create_slug(sub['title'])
-        if slug not in submission_counts:
-            submission_counts[slug] = {'accepted': False, 'attempts': 0}
-        submission_counts[slug]['attempts'] += 1
-        if sub['statusDisplay'] == 'Accepted':
-            submission_counts[slug]['accepted'] = True
-
     # A nemesis problem is one that took more than 1 attempt OR is unsolved.
     nemesis_problems = {
         slug: data['attempts'] for slug, data in submission_counts.items()
@@ -139,47 +96,41 @@ def find_nemesis_problems(username: str, data_manager: DataManager, leetcode_ses
     
     # Sort by number of attempts, shuffle, and return the top 10
     sorted_nemesis = sorted(nemesis_problems.items(), key=lambda item: item[1], reverse=True)
-    random.shuffle(sorted_nemesis)
+    rng = await snapshot.rng("nemesis_problems")
+    rng.shuffle(sorted_nemesis)
     return dict(sorted_nemesis[:10])
 
 
-def find_related_problems(nemesis_problems: dict, data_manager: DataManager) -> dict:
+@metrics.timed("analyzer.related_problems")
+def find_related_problems(nemesis_problems: dict, data_manager: DataManager, rng: random.Random = None) -> dict:
+    rng = rng or random.Random()
     related_problems = {}
     for slug, attempts in nemesis_problems.items():
         question = data_manager.get_question_by_slug(slug)
         if not question:
             continue
 
-        topics = [tag['name'] for tag in question.get("topicTags", [])]
+        topics = data_manager.get_topic_names(question)
         if len(topics) < 3:
             continue
 
-        import itertools
-        topic_combinations = list(itertools.combinations(topics, 3))
-
-        for combo in topic_combinations:
+        for combo in itertools.combinations(topics, 3):
             combo_key = ", ".join(sorted(combo))
             if combo_key not in related_problems:
                 related_problems[combo_key] = []
 
             # Find other questions with the same three topics
-            potential_problems = []
-            for q_slug, q_data in data_manager.questions_by_slug.items():
-                if q_slug == slug:
-                    continue
-
-                q_topics = {tag['name'] for tag in q_data.get("topicTags", [])}
-                if set(combo).issubset(q_topics):
-                    potential_problems.append(q_slug)
+            potential_problems = [q_slug for q_slug in data_manager.get_slugs_with_topics(combo) if q_slug != slug]
             
-            random.shuffle(potential_problems)
+            rng.shuffle(potential_problems)
             related_problems[combo_key].extend(potential_problems[:4])
     
     return related_problems
 
 
-def generate_performance_summary(username: str, data_manager: DataManager) -> dict:
-    profile = leetcode_client.get_user_profile(username)
+@metrics.timed("analyzer.performance_summary")
+async def generate_performance_summary(snapshot: UserSnapshot, data_manager: DataManager) -> dict:
+    profile = await snapshot.profile()
     if not profile:
         return {"error": "Could not fetch user profile."}
         
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from .config import settings
+from . import metrics
+
+# A cache entry is an (expires_at, value) pair; expires_at is a unix timestamp.
+Entry = Tuple[float, Any]
+
+class LRUCache:
+    """
+    Bounded in-process tier. The least recently used entry is evicted first.
+    """
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+class DiskStore:
+    """
+    Size-capped on-disk tier. Entries are written atomically (temp file + rename)
+    and the least recently written files are evicted once the cap is exceeded.
+    """
+    name = "disk"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._scan())
+        return self._size
+
+    def _scan(self):
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.is_file() and item.name.endswith(".json"):
+                        stat = item.stat()
+                        yield item.path, stat.st_mtime, stat.st_size
+        except FileNotFoundError:
+            return
+
+    def get(self, key: str) -> Optional[Entry]:
+        try:
+            with open(self._path(key), 'r') as f:
+                data = json.load(f)
+            return data["expires_at"], data["value"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def set(self, key: str, entry: Entry):
+        expires_at, value = entry
+        path = self._path(key)
+        # In a serverless environment, it's better to ensure the directory exists
+        # just before you need it.
+        os.makedirs(self.directory, exist_ok=True)
+        # Measured before writing, so a first scan doesn't count the new file twice.
+        size = self._current_size()
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            # Serialize up front: json.dump issues one small write per token, which
+            # dominated cache writes for large submission lists.
+            data = json.dumps({"key": key, "expires_at": expires_at, "value": value})
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._size = size - old_size + os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        self._size = None
+
+    def _evict(self):
+        files = sorted(self._scan(), key=lambda item: item[1])
+        total = sum(size for _, _, size in files)
+        # Evict down to 90% of the cap so we don't scan on every write.
+        target = self.max_bytes * 0.9
+        for path, _, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+class TieredCache:
+    """
+    Looks keys up tier by tier (fastest first), promoting hits into the faster
+    tiers. Each kind of data has its own TTL, and hits/misses are counted per kind.
+    Expired entries are kept for another `grace` seconds so they can be served
+    stale (see get_stale) while they are refreshed.
+    """
+    def __init__(self, tiers: list, ttls: dict, grace: float = 0):
+        self.tiers = tiers
+        self.ttls = ttls
+        self.grace = grace
+        self.stats = {}
+
+    def _count(self, kind: str, outcome: str):
+        kind_stats = self.stats.setdefault(kind, {})
+        kind_stats[outcome] = kind_stats.get(outcome, 0) + 1
+
+    def _lookup(self, kind: str, key: str, allow_stale: bool):
+        full_key = f"{kind}:{key}"
+        now = time.time()
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(full_key)
+            if entry is None:
+                continue
+            if entry[0] + self.grace <= now:
+                tier.delete(full_key)
+                continue
+            stale = entry[0] <= now
+            if stale and not allow_stale:
+                continue
+            for faster_tier in self.tiers[:i]:
+                faster_tier.set(full_key, entry)
+            self._count(kind, f"{tier.name}_stale_hits" if stale else f"{tier.name}_hits")
+            return entry[1], stale
+        self._count(kind, "misses")
+        return None, False
+
+    def get(self, kind: str, key: str):
+        return self._lookup(kind, key, allow_stale=False)[0]
+
+    def get_stale(self, kind: str, key: str):
+        """
+        Like get, but also returns entries that expired within the grace window.
+        Returns (value, stale); value is None on a miss.
+        """
+        return self._lookup(kind, key, allow_stale=True)
+
+    def remaining_ttl(self, kind: str, key: str) -> Optional[float]:
+        """
+        Seconds until the entry expires (negative once stale), or None if it isn't cached.
+        """
+        for tier in self.tiers:
+            entry = tier.get(f"{kind}:{key}")
+            if entry is not None:
+                return entry[0] - time.time()
+        return None
+
+    def set(self, kind: str, key: str, value, ttl: float = None):
+        if ttl is None:
+            ttl = self.ttls.get(kind, 0)
+        if ttl <= 0:
+            return
+        entry = (time.time() + ttl, value)
+        for tier in self.tiers:
+            try:
+                tier.set(f"{kind}:{key}", entry)
+            except OSError as e:
+                print(f"Warning: could not write cache entry to {tier.name} tier: {e}")
+
+    def delete(self, kind: str, key: str):
+        for tier in self.tiers:
+            tier.delete(f"{kind}:{key}")
+
+def _build_user_cache() -> TieredCache:
+    tiers = [LRUCache(settings.cache_memory_entries)]
+    if settings.cache_disk_max_bytes > 0:
+        tiers.append(DiskStore(settings.cache_dir, settings.cache_disk_max_bytes))
+    ttls = {
+        "profile": settings.cache_ttl_profile,
+        "submissions": settings.cache_ttl_submissions,
+        "contest_history": settings.cache_ttl_contest_history,
+        "solved": settings.cache_ttl_solved,
+    }
+    return TieredCache(tiers, ttls, grace=settings.cache_stale_grace)
+
+user_cache = _build_user_cache()
+metrics.register_cache("user", user_cache)
+
+def _build_coach_cache() -> TieredCache:
+    tiers = [LRUCache(settings.coach_cache_entries)]
+    if settings.coach_cache_disk_max_bytes > 0:
+        tiers.append(DiskStore(os.path.join(settings.cache_dir, "coach"), settings.coach_cache_disk_max_bytes))
+    return TieredCache(tiers, {"coach": settings.cache_ttl_coach})
+
+coach_cache = _build_coach_cache()
+metrics.register_cache("coach", coach_cache)
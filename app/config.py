@@ -12,6 +12,83 @@ class Settings(BaseSettings):
     data_dir: str = "data"
 
     question_data_path: str = os.path.join(data_dir, "all_contests_questions.json")
+    # Append-only segmented corpus written by scripts/fetch_all_questions.py;
+    # used instead of question_data_path when present.
+    corpus_store_dir: str = os.path.join(data_dir, "corpus")
+    # Precompiled index built from the corpus with `python cli.py build-index`
+    corpus_index_path: str = os.path.join(data_dir, "corpus.idx")
+
+    # Lazy initialization for fast (e.g. serverless) cold starts: startup doesn't block
+    # on the corpus, which is loaded by a background warm-up or the first request that
+    # needs it. The Gemini model is always created on the first coaching request.
+    lazy_init: bool = False
+
+    # GraphQL endpoint; point it at a local stand-in (see bench/) to run offline
+    leetcode_graphql_url: str = "https://leetcode.com/graphql"
+
+    # Shared LeetCode HTTP client
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 30.0
+    http_timeout: float = 30.0
+    http_connect_timeout: float = 10.0
+    http2: bool = False
+
+    # Upstream scheduler: every LeetCode request takes a token from one bucket. Its rate
+    # (requests per second) adapts between upstream_min_rate and upstream_max_rate, and
+    # throttled requests are retried after Retry-After up to upstream_throttle_retries
+    # times. Set upstream_state_file to share the bucket between worker processes and
+    # the crawler.
+    upstream_rate: float = 4.0
+    upstream_min_rate: float = 0.5
+    upstream_max_rate: float = 10.0
+    upstream_burst: float = 10.0
+    upstream_throttle_retries: int = 3
+    upstream_state_file: Optional[str] = None
+
+    # Paginated solved-question fetch (session based)
+    solved_fetch_concurrency: int = 4
+    solved_fetch_retries: int = 3
+    # A cached solved set is used as-is for this many seconds; after that only
+    # submissions newer than its high-water mark are fetched and merged in.
+    solved_sync_interval: float = 600
+
+    # User data cache: bounded in-memory LRU in front of a size-capped disk store.
+    # TTLs are in seconds; a TTL of 0 disables caching for that kind of data.
+    cache_dir: str = "/tmp/cache"
+    cache_memory_entries: int = 1024
+    cache_disk_max_bytes: int = 64 * 1024 * 1024
+    cache_ttl_profile: float = 300
+    cache_ttl_submissions: float = 300
+    cache_ttl_contest_history: float = 3600
+    cache_ttl_solved: float = 7 * 24 * 3600
+    # Stale-while-revalidate: expired user data is still served for this many seconds
+    # while it is refreshed in the background (0 disables)
+    cache_stale_grace: float = 3600
+
+    # Background refresher: every refresh_interval seconds, re-warm the cached data of
+    # the refresh_top_users most requested usernames before it expires (0 disables)
+    refresh_interval: float = 60
+    refresh_top_users: int = 20
+    # With several worker processes, only the one holding a lock on this file refreshes
+    refresh_lock_file: Optional[str] = None
+
+    # Coaching plans, keyed by a hash of the prompt inputs
+    coach_cache_entries: int = 256
+    coach_cache_disk_max_bytes: int = 16 * 1024 * 1024
+    cache_ttl_coach: float = 24 * 3600
+    # Upper bound (seconds) on a single Gemini generation
+    coach_timeout: float = 60.0
+    # Estimated token budget for the coaching prompt; lower-ranked inputs are dropped to fit
+    coach_prompt_token_budget: int = 1500
+
+    # Per-section timeout (seconds) for the concurrent sections of a full analysis
+    analysis_section_timeout: float = 20.0
+
+    # Batch analysis: users per aliased GraphQL request, concurrent analyses, and request size cap
+    batch_query_size: int = 10
+    batch_analysis_concurrency: int = 8
+    batch_max_users: int = 500
 
     class Config:
         env_file = ".env"
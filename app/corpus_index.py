@@ -0,0 +1,71 @@
+import json
+import os
+import pickle
+import struct
+
+# Layout: MAGIC | uint32 format version | uint32 header length | JSON header | pickled columns
+MAGIC = b"CONLITIX"
+# 2: slugs are LeetCode titleSlugs rather than derived from titles
+# 3: slugs of records without a titleSlug are derived like LeetCode's
+FORMAT_VERSION = 3
+_PREFIX = struct.Struct("<8sII")
+
+def _source_signature(source_path: str):
+    try:
+        stat = os.stat(source_path)
+    except FileNotFoundError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def write_index(data_manager, path: str, source_path: str):
+    """
+    Writes the data manager's index as a versioned, precompiled file that can be
+    loaded in one shot instead of re-parsing and re-indexing the JSON corpus.
+    """
+    questions = data_manager.questions
+    columns = {
+        "slugs": [q.slug for q in questions],
+        "titles": [q.title for q in questions],
+        "difficulties": [q.difficulty for q in questions],
+        "topic_ids": [q.topic_ids for q in questions],
+        "contest_slugs": [q.contest_slug for q in questions],
+        "topics": data_manager.topics,
+        "topic_bitsets": [data_manager.topic_bitsets[topic] for topic in data_manager.topics],
+        "difficulty_bitsets": data_manager.difficulty_bitsets,
+    }
+    header = json.dumps({
+        "source": _source_signature(source_path),
+        "questions": len(questions),
+        "topics": len(data_manager.topics),
+    }).encode()
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        pickle.dump(columns, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def read_index(path: str, source_path: str):
+    """
+    Returns the index columns, or None when the file is missing, was written by
+    another format version, or is older than the JSON corpus it was built from.
+    """
+    try:
+        with open(path, 'rb') as f:
+            magic, version, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                print(f"Warning: Ignoring corpus index {path} with unsupported format.")
+                return None
+            header = json.loads(f.read(header_length))
+            source = _source_signature(source_path)
+            if source is not None and header.get("source") != source:
+                print(f"Warning: Corpus index {path} is stale; falling back to {source_path}.")
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (struct.error, ValueError, EOFError, pickle.UnpicklingError) as e:
+        print(f"Warning: Could not read corpus index {path}: {e}")
+        return None
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+
+def create_slug(title: str) -> str:
+    # LeetCode's titleSlug: lowercase, punctuation dropped rather than turned into
+    # hyphens ("Pascal's Triangle" -> "pascals-triangle", "Pow(x, n)" -> "powx-n").
+    return re.sub(r'[\s-]+', '-', re.sub(r'[^\w\s-]', '', title.lower())).strip('-')
+
+def _with_title_slug(question: dict) -> dict:
+    if not question or question.get("titleSlug") or not question.get("title"):
+        return question
+    return dict(question, titleSlug=create_slug(question["title"]))
+
+class CorpusStore:
+    """
+    Append-only, segmented store for the contest question corpus.
+
+        <root>/manifest.jsonl          one line per committed contest (latest line wins)
+        <root>/contests/<slug>.jsonl   one question per line
+
+    A segment is written to a temporary file and renamed into place before its
+    manifest line is appended, so a crash can at worst leave an unreferenced
+    segment or a truncated last manifest line, both of which are ignored on read
+    (the next append starts on a fresh line rather than continuing the torn one).
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.jsonl")
+        self.contests_dir = os.path.join(root, "contests")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def _segment_path(self, contest_slug: str) -> str:
+        return os.path.join(self.contests_dir, f"{contest_slug}.jsonl")
+
+    def read_manifest(self) -> dict:
+        """
+        Returns {contest_slug: manifest entry} in the order contests were first committed.
+        """
+        entries = {}
+        if not self.exists():
+            return entries
+        with open(self.manifest_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[entry["titleSlug"]] = entry
+        return entries
+
+    def append_contest(self, contest: dict, questions: list):
+        os.makedirs(self.contests_dir, exist_ok=True)
+        contest_slug = contest["titleSlug"]
+        path = self._segment_path(contest_slug)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for question in questions:
+                f.write(json.dumps(question) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        entry = {
+            "title": contest.get("title"),
+            "titleSlug": contest_slug,
+            "startTime": contest.get("startTime"),
+            "questions": len(questions),
+        }
+        with open(self.manifest_path, 'a') as f:
+            f.write(self._line_break_needed() + json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _line_break_needed(self) -> str:
+        # A crash mid-append leaves a last line without its newline.
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return ""
+                f.seek(-1, os.SEEK_END)
+                return "" if f.read(1) == b"\n" else "\n"
+        except FileNotFoundError:
+            return ""
+
+    def iter_questions(self, contest_slug: str):
+        """
+        Streams a contest's questions one line at a time.
+        """
+        try:
+            with open(self._segment_path(contest_slug), 'r') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            print(f"Warning: Missing corpus segment for contest: {contest_slug}")
+
+    def iter_contests(self):
+        """
+        Yields (manifest entry, question iterator) for every committed contest.
+        """
+        for contest_slug, entry in self.read_manifest().items():
+            yield entry, self.iter_questions(contest_slug)
+
+    def compact(self):
+        """
+        Rewrites the manifest with one line per contest and removes segments
+        (and leftover temporary files) that no manifest line refers to.
+        """
+        entries = self.read_manifest()
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+        if os.path.isdir(self.contests_dir):
+            live = {f"{contest_slug}.jsonl" for contest_slug in entries}
+            for name in os.listdir(self.contests_dir):
+                if name not in live:
+                    os.remove(os.path.join(self.contests_dir, name))
+        return len(entries)
+
+    def import_json(self, path: str) -> int:
+        """
+        Imports contests from the legacy single-file JSON corpus that are not in the store yet.
+        """
+        with open(path, 'r') as f:
+            data = json.load(f)
+        known = self.read_manifest()
+        imported = 0
+        for contest_slug, contest_data in data.items():
+            if contest_slug in known:
+                continue
+            contest = dict(contest_data, titleSlug=contest_data.get("titleSlug") or contest_slug)
+            # Older corpus files lack the questions' titleSlug, which submissions are matched on.
+            self.append_contest(contest, [_with_title_slug(q) for q in contest_data.get("questions", [])])
+            imported += 1
+        return imported
+
+    def export_json(self, path: str):
+        """
+        Writes the store back out in the legacy single-file JSON format.
+        """
+        data = {}
+        for entry, questions in self.iter_contests():
+            data[entry["titleSlug"]] = {
+                "title": entry.get("title"),
+                "titleSlug": entry["titleSlug"],
+                "startTime": entry.get("startTime"),
+                "questions": list(questions),
+            }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
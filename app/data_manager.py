@@ -1,46 +1,259 @@
 import json
-import re
 import os
+import sys
+import threading
+from collections import OrderedDict
 from app.config import settings
+from app import corpus_index
+from app import metrics
+from app.corpus_store import CorpusStore, create_slug
+from app.json_stream import iter_object_items
+
+def question_slug(question: dict) -> str:
+    """
+    Returns LeetCode's titleSlug for a question or submission. Older corpus files
+    don't carry it, so it is derived from the title the way LeetCode does for those.
+    """
+    return question.get("titleSlug") or create_slug(question["title"])
+
+def _iter_bits(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+class Question:
+    """
+    Compact in-memory question record holding only what the analysis paths use.
+    Heavy fields (content, hints, solution, ...) are loaded from disk on demand
+    through DataManager.get_question_details.
+    """
+    __slots__ = ("id", "slug", "title", "difficulty", "topic_ids", "contest_slug")
+
+    def __init__(self, id: int, slug: str, title: str, difficulty: str, topic_ids: tuple, contest_slug: str):
+        self.id = id
+        self.slug = slug
+        self.title = title
+        self.difficulty = difficulty
+        self.topic_ids = topic_ids
+        self.contest_slug = contest_slug
+
+    def __repr__(self):
+        return f"Question(id={self.id}, slug={self.slug!r}, difficulty={self.difficulty!r})"
 
 class DataManager:
+    DETAILS_CACHE_SIZE = 64
+
     def __init__(self):
+        # Questions are addressed by dense integer ids (their index in `questions`).
+        self.questions = []
         self.questions_by_slug = {}
-        self.questions_by_topic = {}
+        # Topic names are interned to small integer ids, and each topic keeps a
+        # bitset of question ids (bit i is set when question i has the topic).
+        self.topics = []
+        self.topic_ids = {}
+        self.topic_bitsets = {}
+        self.difficulty_bitsets = {}
+        # topic -> difficulty -> tuple of question ids, precomputed for topic-gap suggestions
+        self.topic_candidates = {}
+        # Set once the corpus has been loaded, e.g. before the server forked its workers.
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self._details_cache = OrderedDict()
+        self.store = CorpusStore(settings.corpus_store_dir)
+
+    def _topic_id(self, topic_name: str) -> int:
+        topic_id = self.topic_ids.get(topic_name)
+        if topic_id is None:
+            topic_id = len(self.topics)
+            self.topic_ids[topic_name] = topic_id
+            self.topics.append(topic_name)
+            self.topic_bitsets[topic_name] = 0
+        return topic_id
+
+    def _add_question(self, question: dict, contest_slug: str):
+        slug = sys.intern(question_slug(question))
+        record = self.questions_by_slug.get(slug)
+        topic_names = [tag.get("name") for tag in question.get("topicTags") or [] if tag.get("name")]
+        topic_ids = tuple(self._topic_id(name) for name in topic_names)
+
+        if record is None:
+            record = Question(
+                id=len(self.questions),
+                slug=slug,
+                title=question["title"],
+                difficulty=sys.intern(question.get("difficulty") or ""),
+                topic_ids=topic_ids,
+                contest_slug=contest_slug,
+            )
+            self.questions.append(record)
+            self.questions_by_slug[slug] = record
+        else:
+            # Questions can appear in more than one contest; the latest copy wins.
+            for old_topic_id in record.topic_ids:
+                self.topic_bitsets[self.topics[old_topic_id]] &= ~(1 << record.id)
+            record.title = question["title"]
+            record.difficulty = sys.intern(question.get("difficulty") or "")
+            record.topic_ids = topic_ids
+            record.contest_slug = contest_slug
+
+        for topic_name in topic_names:
+            self.topic_bitsets[topic_name] |= 1 << record.id
+
+    def _build_difficulty_bitsets(self):
+        self.difficulty_bitsets = {}
+        for record in self.questions:
+            self.difficulty_bitsets[record.difficulty] = self.difficulty_bitsets.get(record.difficulty, 0) | (1 << record.id)
+
+    def _build_topic_candidates(self):
+        # Ids are listed in ascending order so sampled suggestions stay stable.
+        self.topic_candidates = {}
+        for topic, topic_bits in self.topic_bitsets.items():
+            self.topic_candidates[topic] = {
+                difficulty: tuple(_iter_bits(topic_bits & difficulty_bits))
+                for difficulty, difficulty_bits in self.difficulty_bitsets.items()
+                if topic_bits & difficulty_bits
+            }
+
+    def _source_path(self) -> str:
+        return self.store.manifest_path if self.store.exists() else settings.question_data_path
+
+    def _load_from_index(self) -> bool:
+        columns = corpus_index.read_index(settings.corpus_index_path, self._source_path())
+        if columns is None:
+            return False
+
+        self.topics = columns["topics"]
+        self.topic_ids = {topic: topic_id for topic_id, topic in enumerate(self.topics)}
+        self.topic_bitsets = dict(zip(self.topics, columns["topic_bitsets"]))
+        self.difficulty_bitsets = columns["difficulty_bitsets"]
+        self.questions = [
+            Question(question_id, slug, title, sys.intern(difficulty), topic_ids, contest_slug)
+            for question_id, (slug, title, difficulty, topic_ids, contest_slug) in enumerate(zip(
+                columns["slugs"], columns["titles"], columns["difficulties"],
+                columns["topic_ids"], columns["contest_slugs"],
+            ))
+        ]
+        self.questions_by_slug = {record.slug: record for record in self.questions}
+        self._build_topic_candidates()
+        return True
+
+    @metrics.timed("corpus_load")
+    def load_and_index_data(self, use_index: bool = True):
+        self._load(use_index)
+        self.loaded = True
+
+    def ensure_loaded(self):
+        """
+        Loads the corpus unless it already is; safe to call from several threads.
+        """
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load_and_index_data()
+
+    def _load(self, use_index: bool):
+        # Prefer the precompiled index (see `cli.py build-index`), then the
+        # segmented corpus store, falling back to the single-file JSON corpus.
+        if use_index and self._load_from_index():
+            return
+
+        # Contests are parsed and indexed one at a time, keeping only the compact
+        # records, so peak memory stays around a single contest.
+        if self.store.exists():
+            contests = ((contest["titleSlug"], questions) for contest, questions in self.store.iter_contests())
+            self._index_contests(contests)
+            return
 
-    def load_and_index_data(self):
         try:
             # Ensure the path is constructed correctly for the environment
             path = settings.question_data_path
             with open(path, 'r') as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+                contests = ((contest_slug, contest_data.get("questions", [])) for contest_slug, contest_data in iter_object_items(f))
+                self._index_contests(contests)
+        except FileNotFoundError:
             print(f"Warning: Could not load data from {settings.question_data_path}")
-            return
+        except json.JSONDecodeError as e:
+            print(f"Warning: Could not parse {settings.question_data_path} ({e}); loaded {len(self.questions)} questions before the error.")
+            self._build_difficulty_bitsets()
+            self._build_topic_candidates()
 
-        for contest_slug, contest_data in data.items():
-            questions = contest_data.get("questions", [])
-            if not questions:
-                # Log or handle contests that do not contain any questions.
-                # print(f"Info: No questions found for contest: {contest_slug}")
-                pass
+    def _index_contests(self, contests):
+        for contest_slug, questions in contests:
             for question in questions:
                 if question and "title" in question:
-                    # Create a URL-friendly slug by converting the title to lowercase, replacing non-word characters with hyphens, and removing leading/trailing hyphens
-                    title = question["title"]
-                    slug = re.sub(r'\W+', '-', title.lower()).strip('-')
-                    self.questions_by_slug[slug] = question
-                    
-                    for tag in question.get("topicTags", []):
-                        topic_name = tag.get("name")
-                        if topic_name:
-                            if topic_name not in self.questions_by_topic:
-                                self.questions_by_topic[topic_name] = []
-                            self.questions_by_topic[topic_name].append(question)
-        
+                    self._add_question(question, contest_slug)
+        self._build_difficulty_bitsets()
+        self._build_topic_candidates()
+
+    def write_index(self):
+        corpus_index.write_index(self, settings.corpus_index_path, self._source_path())
 
     def get_question_by_slug(self, slug: str):
         return self.questions_by_slug.get(slug)
 
     def get_questions_by_topic(self, topic: str):
-        return self.questions_by_topic.get(topic, [])
+        return [self.questions[i] for i in _iter_bits(self.topic_bitsets.get(topic, 0))]
+
+    def get_topic_candidates(self, topic: str, difficulty: str) -> tuple:
+        """
+        Returns the ids of the questions with the given topic and difficulty.
+        """
+        return self.topic_candidates.get(topic, {}).get(difficulty, ())
+
+    def get_question_ids(self, slugs) -> set:
+        """
+        Maps slugs to question ids, skipping questions that aren't in the corpus.
+        """
+        questions_by_slug = self.questions_by_slug
+        return {questions_by_slug[slug].id for slug in slugs if slug in questions_by_slug}
+
+    def get_topic_names(self, question: Question) -> list:
+        return [self.topics[topic_id] for topic_id in question.topic_ids]
+
+    def get_slugs_with_topics(self, topics) -> list:
+        """
+        Returns the slugs of every question tagged with all of the given topics.
+        """
+        bits = None
+        for topic in topics:
+            topic_bits = self.topic_bitsets.get(topic, 0)
+            bits = topic_bits if bits is None else bits & topic_bits
+            if not bits:
+                return []
+        return [self.questions[i].slug for i in _iter_bits(bits or 0)]
+
+    def get_question_details(self, slug: str):
+        """
+        Loads the full question (content, hints, stats, ...) from disk.
+        """
+        record = self.questions_by_slug.get(slug)
+        if record is None:
+            return None
+        if slug in self._details_cache:
+            self._details_cache.move_to_end(slug)
+            return self._details_cache[slug]
+
+        details = None
+        for question in self._read_contest_questions(record.contest_slug):
+            if question and question.get("title") and question_slug(question) == record.slug:
+                details = question
+                break
+
+        self._details_cache[slug] = details
+        if len(self._details_cache) > self.DETAILS_CACHE_SIZE:
+            self._details_cache.popitem(last=False)
+        return details
+
+    def _read_contest_questions(self, contest_slug: str):
+        if self.store.exists():
+            return self.store.iter_questions(contest_slug)
+        try:
+            with open(settings.question_data_path, 'r') as f:
+                for key, contest_data in iter_object_items(f):
+                    if key == contest_slug:
+                        return contest_data.get("questions", [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            print(f"Warning: Could not load data from {settings.question_data_path}")
+        return []
@@ -0,0 +1,155 @@
+import json
+import re
+
+_WHITESPACE = re.compile(r'\s*')
+# Characters that could still extend a number, e.g. the ".5" after "12".
+_NUMBER_TAIL = re.compile(r'[\d.eE+-]*')
+
+class _BufferedReader:
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = None):
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+        # Drop everything already consumed so the buffer only holds the current value.
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or self.eof:
+                return
+            self.fill()
+
+    def next_char(self) -> str:
+        self.skip_whitespace()
+        if self.pos >= len(self.buf):
+            raise json.JSONDecodeError("Unexpected end of data", self.buf, self.pos)
+        char = self.buf[self.pos]
+        self.pos += 1
+        return char
+
+    def decode(self, decoder: json.JSONDecoder):
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # A value followed only by number characters up to the end of the
+                # buffer may be a truncated number ("12" of "12.5").
+                if self.eof or _NUMBER_TAIL.match(self.buf, end).end() < len(self.buf):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow geometrically so large values aren't re-parsed too many times.
+            self.fill(max(self.chunk_size, len(self.buf) - self.pos))
+
+def iter_object_items(f, chunk_size: int = 1 << 16):
+    """
+    Streams the members of a top-level JSON object from a text file, yielding
+    (key, value) pairs one at a time so only one member is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    reader = _BufferedReader(f, chunk_size)
+    reader.fill()
+    if reader.next_char() != '{':
+        raise json.JSONDecodeError("Expected '{'", reader.buf, reader.pos)
+
+    reader.skip_whitespace()
+    if reader.buf.startswith('}', reader.pos):
+        return
+
+    while True:
+        key = reader.decode(decoder)
+        if not isinstance(key, str) or reader.next_char() != ':':
+            raise json.JSONDecodeError("Expected an object key", reader.buf, reader.pos)
+        yield key, reader.decode(decoder)
+
+        separator = reader.next_char()
+        if separator == '}':
+            return
+        if separator != ',':
+            raise json.JSONDecodeError("Expected ',' or '}'", reader.buf, reader.pos)
+
+class ArrayItemParser:
+    """
+    Incrementally scans a JSON document that arrives in chunks (e.g. streamed
+    LLM output, possibly wrapped in markdown fences) and returns the objects of
+    the watched arrays as soon as each one is complete:
+
+        parser = ArrayItemParser({"focus_areas", "suggested_problems"})
+        for chunk in chunks:
+            for key, item in parser.feed(chunk):
+                ...
+    """
+    def __init__(self, keys):
+        self.keys = set(keys)
+        self.text = ""
+        self._pos = 0
+        self._stack = []           # container chars, with the key for arrays: ('{', None) / ('[', key)
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_string = None
+        self._pending_key = None
+        self._item_start = None    # (start offset, key, stack depth) of the item being captured
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._item_start is None:
+                        self._last_string = json.loads(text[self._string_start:i + 1])
+                continue
+
+            if char == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = i
+            elif char == ':':
+                if self._stack and self._stack[-1][0] == '{':
+                    self._pending_key = self._last_string
+            elif char == '{':
+                parent = self._stack[-1] if self._stack else None
+                if (self._item_start is None and parent is not None and parent[0] == '['
+                        and parent[1] in self.keys):
+                    self._item_start = (i, parent[1], len(self._stack))
+                self._stack.append(('{', None))
+                self._pending_key = None
+            elif char == '[':
+                if self._stack:
+                    key = self._pending_key if self._stack[-1][0] == '{' else None
+                    self._stack.append(('[', key))
+                self._pending_key = None
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if (char == '}' and self._item_start is not None
+                        and len(self._stack) == self._item_start[2]):
+                    start, key, _ = self._item_start
+                    self._item_start = None
+                    try:
+                        items.append((key, json.loads(text[start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+            elif char == ',':
+                self._pending_key = None
+        self._pos = len(text)
+        return items
@@ -1,25 +1,28 @@
 import httpx
 import os
 import asyncio
-from typing import List, Set, Tuple
+import functools
+import hashlib
+import re
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import List, Optional, Set, Tuple
+from .config import settings
+from . import metrics
+from .cache import user_cache
+from .data_manager import question_slug
+from . import rate_limit
+from .rate_limit import UpstreamScheduler, retry_after_seconds
 
-LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql"
 BASE_URL = "https://leetcode.com"
 
-# GraphQL queries
-USER_PROFILE_QUERY = """
-query getUserProfile($username: String!) {
-    matchedUser(username: $username) {
-        submitStats: submitStatsGlobal {
-            acSubmissionNum {
-                difficulty
-                count
-            }
-        }
-    }
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Content-Type': 'application/json',
+    'Referer': BASE_URL
 }
-"""
 
+# GraphQL queries
 SUBMISSIONS_QUERY = """
 query submissionList($offset: Int!, $limit: Int!, $questionSlug: String) {
     submissionList(offset: $offset, limit: $limit, questionSlug: $questionSlug) {
@@ -27,6 +30,7 @@ query submissionList($offset: Int!, $limit: Int!, $questionSlug: String) {
         submissions {
             id
             title
+            titleSlug
             statusDisplay
             timestamp
         }
@@ -34,35 +38,239 @@ query submissionList($offset: Int!, $limit: Int!, $questionSlug: String) {
 }
 """
 
-def get_user_profile(username: str):
+# Field selections shared by the single-user and batched queries
+PROFILE_FIELDS = """
+    username
+    profile {
+        realName
+        websites
+        countryName
+        company
+        school
+        aboutMe
+        reputation
+        ranking
+    }
+    submitStats {
+        acSubmissionNum {
+            difficulty
+            count
+            submissions
+        }
+        totalSubmissionNum {
+            difficulty
+            count
+            submissions
+        }
+    }
+"""
+
+RECENT_SUBMISSION_FIELDS = """
+    title
+    titleSlug
+    timestamp
+    statusDisplay
+    lang
+    url
+"""
+
+CONTEST_RANKING_FIELDS = """
+    attendedContestsCount
+    rating
+    globalRanking
+    totalParticipants
+    topPercentage
+"""
+
+CONTEST_HISTORY_FIELDS = """
+    attended
+    trendDirection
+    problemsSolved
+    totalProblems
+    finishTimeInSeconds
+    rating
+    ranking
+    contest {
+        title
+        startTime
+    }
+"""
+
+# Sections that can be combined into one user query, as root field -> selection.
+# `$USER` stands for the user's variable. A section's result has the same shape
+# as its standalone fetcher: the field's value, or {root field: value} when the
+# section spans several root fields.
+USER_QUERY_SECTIONS = {
+    "profile": {
+        "matchedUser": "matchedUser(username: $USER) {" + PROFILE_FIELDS + "}",
+    },
+    "submissions": {
+        "recentSubmissionList": "recentSubmissionList(username: $USER, limit: $limit) {" + RECENT_SUBMISSION_FIELDS + "}",
+    },
+    "contest_history": {
+        "userContestRanking": "userContestRanking(username: $USER) {" + CONTEST_RANKING_FIELDS + "}",
+        "userContestRankingHistory": "userContestRankingHistory(username: $USER) {" + CONTEST_HISTORY_FIELDS + "}",
+    },
+}
+
+# A single pooled client is shared by every request so connections to
+# leetcode.com are kept alive instead of paying a new TCP+TLS handshake per call.
+_client: Optional[httpx.AsyncClient] = None
+
+def _http2_enabled() -> bool:
+    if not settings.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("Warning: http2 is enabled but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+        return False
+    return True
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+    # The client is shared between users, so never persist cookies set by
+    # leetcode.com; session cookies are passed explicitly per request instead.
+    cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    return httpx.AsyncClient(
+        http2=_http2_enabled(),
+        limits=limits,
+        timeout=timeout,
+        headers=DEFAULT_HEADERS,
+        cookies=cookies,
+    )
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client, creating it on first use (e.g. from the CLI).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+# Every LeetCode request goes through this scheduler, so API traffic, background
+# refreshes and solved-set pagination share one rate limit and back off together.
+_scheduler = UpstreamScheduler(
+    rate=settings.upstream_rate,
+    min_rate=settings.upstream_min_rate,
+    max_rate=settings.upstream_max_rate,
+    capacity=settings.upstream_burst,
+    state_file=settings.upstream_state_file,
+)
+
+def claim_rate_bounds():
+    """
+    Applies the configured rate bounds to the (possibly shared) upstream bucket.
+    """
+    _scheduler.claim_bounds()
+
+def client_ready() -> bool:
+    return _client is not None and not _client.is_closed
+
+async def startup():
+    get_client()
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# Background refreshes in flight, by key, so a stale entry is only refetched once.
+_refreshing = {}
+
+def _refresh_in_background(key: str, refresh):
+    """
+    Runs refresh() in its own task, unless a refresh for `key` is already running.
+    Used to revalidate stale cache entries after they have been served.
+    """
+    if key in _refreshing:
+        return
+
+    async def run():
+        try:
+            with rate_limit.priority(rate_limit.BACKGROUND):
+                await refresh()
+        except Exception as e:
+            print(f"Warning: background refresh of {key} failed: {e}")
+        finally:
+            _refreshing.pop(key, None)
+
+    _refreshing[key] = asyncio.ensure_future(run())
+
+def _cached(kind: str, key):
+    """
+    Serves the decorated fetcher from the user cache. Empty results (failed or
+    missing lookups) are never cached. Stale entries are served as-is and
+    refreshed in the background.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+
+            async def fetch():
+                result = await func(*args, **kwargs)
+                if result:
+                    user_cache.set(kind, cache_key, result)
+                return result
+
+            cached, stale = user_cache.get_stale(kind, cache_key)
+            if cached is None:
+                return await fetch()
+            if stale:
+                _refresh_in_background(f"{kind}:{cache_key}", fetch)
+            return cached
+        return wrapper
+    return decorator
+
+def _session_key(username: str, cookie: str, *args, **kwargs) -> str:
+    # The solved set belongs to whoever owns the session, so key on the cookie too.
+    return f"{username}:{hashlib.sha256((cookie or '').encode()).hexdigest()[:16]}"
+
+_OPERATION_NAME = re.compile(r'^\s*query\s+(\w+)')
+
+def _operation_name(payload: dict) -> str:
+    if payload.get("operationName"):
+        return payload["operationName"]
+    match = _OPERATION_NAME.match(payload.get("query", ""))
+    return match.group(1) if match else "anonymous"
+
+async def _post_graphql(payload: dict, headers: dict = None) -> dict:
+    """
+    Sends a GraphQL request through the upstream scheduler. A throttled (429)
+    request pauses all upstream requests for its Retry-After delay and is retried.
+    """
+    operation = _operation_name(payload)
+    retries = settings.upstream_throttle_retries
+    for attempt in range(retries + 1):
+        with metrics.timer("leetcode.queue"):
+            await _scheduler.acquire()
+        try:
+            with metrics.upstream_call("leetcode", operation):
+                response = await get_client().post(settings.leetcode_graphql_url, json=payload, headers=headers)
+                response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 429 or attempt == retries:
+                raise
+            delay = retry_after_seconds(e.response, 2 ** (attempt + 1))
+            print(f"Warning: LeetCode throttled {operation}; pausing upstream requests for {delay:.1f}s")
+            await _scheduler.on_throttle(delay)
+            continue
+        _scheduler.on_success()
+        return response.json()
+
+@_cached("profile", lambda username: username)
+async def get_user_profile(username: str):
     try:
-        leetcode_url = LEETCODE_GRAPHQL_URL
         query = """query userPublicProfile($username: String!) {
-            matchedUser(username: $username) {
-                username
-                profile {
-                    realName
-                    websites
-                    countryName
-                    company
-                    school
-                    aboutMe
-                    reputation
-                    ranking
-                }
-                submitStats {
-                    acSubmissionNum {
-                        difficulty
-                        count
-                        submissions
-                    }
-                    totalSubmissionNum {
-                        difficulty
-                        count
-                        submissions
-                    }
-                }
-            }
+            matchedUser(username: $username) {""" + PROFILE_FIELDS + """}
         }"""
         
         payload = {
@@ -70,17 +278,8 @@ def get_user_profile(username: str):
             "variables": {"username": username},
             "operationName": "userPublicProfile"
         }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Content-Type': 'application/json',
-            'Referer': BASE_URL
-        }
 
-        response = httpx.post(leetcode_url, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = await _post_graphql(payload)
         
         if not data.get("data", {}).get("matchedUser"):
             print(f"User not found: {username}")
@@ -94,30 +293,12 @@ def get_user_profile(username: str):
         print(f"An error occurred fetching user profile for {username}: {e}")
         return None
 
-def get_user_contest_history(username: str):
+@_cached("contest_history", lambda username: username)
+async def get_user_contest_history(username: str):
     try:
-        leetcode_url = LEETCODE_GRAPHQL_URL
         query = """query userContestRankingInfo($username: String!) {
-            userContestRanking(username: $username) {
-                attendedContestsCount
-                rating
-                globalRanking
-                totalParticipants
-                topPercentage
-            }
-            userContestRankingHistory(username: $username) {
-                attended
-                trendDirection
-                problemsSolved
-                totalProblems
-                finishTimeInSeconds
-                rating
-                ranking
-                contest {
-                    title
-                    startTime
-                }
-            }
+            userContestRanking(username: $username) {""" + CONTEST_RANKING_FIELDS + """}
+            userContestRankingHistory(username: $username) {""" + CONTEST_HISTORY_FIELDS + """}
         }"""
         
         payload = {
@@ -125,17 +306,8 @@ def get_user_contest_history(username: str):
             "variables": {"username": username},
             "operationName": "userContestRankingInfo"
         }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Content-Type': 'application/json',
-            'Referer': BASE_URL
-        }
 
-        response = httpx.post(leetcode_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = await _post_graphql(payload)
         
         if not data.get("data"):
             print(f"Contest history not found for user: {username}")
@@ -149,35 +321,19 @@ def get_user_contest_history(username: str):
         print(f"An error occurred fetching contest history for {username}: {e}")
         return None
 
-def get_user_submissions(username: str, limit: int = 20):
+@_cached("submissions", lambda username, limit=20: f"{username}:{limit}")
+async def get_user_submissions(username: str, limit: int = 20):
     try:
-        leetcode_url = LEETCODE_GRAPHQL_URL
         query = """query recentSubmissions($username: String!, $limit: Int!) {
-            recentSubmissionList(username: $username, limit: $limit) {
-                title
-                titleSlug
-                timestamp
-                statusDisplay
-                lang
-                url
-            }
+            recentSubmissionList(username: $username, limit: $limit) {""" + RECENT_SUBMISSION_FIELDS + """}
         }"""
         
         payload = {
             "query": query,
             "variables": {"username": username, "limit": limit}
         }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Content-Type': 'application/json',
-            'Referer': BASE_URL
-        }
 
-        response = httpx.post(leetcode_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = await _post_graphql(payload)
         
         if "errors" in data:
             print(f"Submissions not found for user {username}: {data['errors']}")
@@ -191,144 +347,302 @@ def get_user_submissions(username: str, limit: int = 20):
         print(f"An error occurred fetching submissions for {username}: {e}")
         return []
 
-def get_user_submission_count(username: str):
+async def get_user_submission_count(username: str):
     """
     Fetches the total number of submissions for a given LeetCode username.
     """
-    try:
-        leetcode_url = LEETCODE_GRAPHQL_URL
-        query = """query userPublicProfile($username: String!) {
-            matchedUser(username: $username) {
-                submitStats {
-                    totalSubmissionNum {
-                        count
-                    }
-                }
-            }
-        }"""
-        
-        payload = {
-            "query": query,
-            "variables": {"username": username},
-            "operationName": "userPublicProfile"
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Content-Type': 'application/json',
-            'Referer': BASE_URL
-        }
+    # The profile already carries submitStats, so share its (cached) query.
+    profile = await get_user_profile(username)
+    if not profile:
+        return None
+    total_submission_num = profile["submitStats"]["totalSubmissionNum"]
+    return sum(item['count'] for item in total_submission_num)
 
-        response = httpx.post(leetcode_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if not data.get("data", {}).get("matchedUser"):
-            print(f"User not found: {username}")
-            return None
-        
-        total_submission_num = data["data"]["matchedUser"]["submitStats"]["totalSubmissionNum"]
-        return sum(item['count'] for item in total_submission_num)
+def section_cache_key(section: str, username: str, limit: int) -> str:
+    return f"{username}:{limit}" if section == "submissions" else username
+
+def compose_user_query(requested: List[Tuple[str, List[str]]]) -> Tuple[str, dict]:
+    """
+    Merges the sections requested for each user into a single GraphQL document.
+    The i-th user's fields are aliased u{i}_{root field}. Returns (query, variables);
+    the caller supplies $limit when submissions are requested.
+    """
+    declarations = []
+    fields = []
+    variables = {}
+    for i, (username, sections) in enumerate(requested):
+        variables[f"u{i}"] = username
+        declarations.append(f"$u{i}: String!")
+        for section in sections:
+            for root, selection in USER_QUERY_SECTIONS[section].items():
+                fields.append(f"u{i}_{root}: " + selection.replace("$USER", f"$u{i}"))
+    if any("submissions" in sections for _, sections in requested):
+        # GraphQL rejects declared variables that no field uses.
+        declarations.append("$limit: Int!")
+    query = "query userData(" + ", ".join(declarations) + ") {\n" + "\n".join(fields) + "\n}"
+    return query, variables
+
+def split_user_response(data: dict, index: int, sections: List[str]) -> dict:
+    """
+    Splits the aliased fields of the index-th user back into {section: result}.
+    """
+    result = {}
+    for section in sections:
+        values = {root: data.get(f"u{index}_{root}") for root in USER_QUERY_SECTIONS[section]}
+        result[section] = values if len(values) > 1 else next(iter(values.values()))
+    if "submissions" in result:
+        result["submissions"] = result["submissions"] or []
+    return result
+
+async def get_users_data(requested: dict, limit: int = 20, refresh: bool = False) -> dict:
+    """
+    Fetches any mix of profile, recent submissions and contest history for one or
+    more users ({username: [sections]}) in a single combined GraphQL request.
+    Sections already in the cache are not queried again (stale ones are served and
+    refreshed in the background) unless `refresh` is set. Returns {username:
+    {section: result}}; if the request fails, the users it could not fetch are
+    left out so callers can fall back to the standalone fetchers.
+    """
+    results = {}
+    pending = []
+    stale = {}
+    for username, sections in requested.items():
+        found = {}
+        for section in sections if not refresh else ():
+            cached, is_stale = user_cache.get_stale(section, section_cache_key(section, username, limit))
+            if cached is not None:
+                found[section] = cached
+                if is_stale:
+                    stale.setdefault(username, []).append(section)
+        missing = [section for section in sections if section not in found]
+        results[username] = found
+        if missing:
+            pending.append((username, missing))
+    if stale:
+        key = "users:" + ",".join(f"{username}/{'+'.join(sections)}" for username, sections in stale.items())
+        _refresh_in_background(key, lambda: get_users_data(stale, limit, refresh=True))
+    if not pending:
+        return results
 
+    query, variables = compose_user_query(pending)
+    if any("submissions" in sections for _, sections in pending):
+        variables["limit"] = limit
+    payload = {"query": query, "variables": variables, "operationName": "userData"}
+    try:
+        data = await _post_graphql(payload)
     except httpx.HTTPStatusError as e:
-        print(f"HTTP Error fetching submission count for {username}: {e.response.status_code} - {e.response.text}")
-        return None
+        print(f"HTTP Error fetching data for {len(pending)} users: {e.response.status_code} - {e.response.text}")
+        return {username: found for username, found in results.items() if found}
     except Exception as e:
-        print(f"An error occurred fetching submission count for {username}: {e}")
-        return None
+        print(f"An error occurred fetching data for {len(pending)} users: {e}")
+        return {username: found for username, found in results.items() if found}
 
-async def _fetch_submissions_page(client: httpx.AsyncClient, offset: int, limit: int, headers: dict) -> Tuple[List[dict], bool]:
+    # A missing user only nulls its own aliases; the other users are still returned.
+    fields = data.get("data") or {}
+    for i, (username, sections) in enumerate(pending):
+        fetched = split_user_response(fields, i, sections)
+        if "profile" in fetched and not fetched["profile"]:
+            print(f"User not found: {username}")
+        for section, value in fetched.items():
+            if value:
+                user_cache.set(section, section_cache_key(section, username, limit), value)
+        results[username].update(fetched)
+    return results
+
+class SessionError(Exception):
+    """
+    Raised when LeetCode rejects the session cookie.
+    """
+
+def _difficulty_total(counts: list, field: str = 'count') -> int:
+    # Stats are broken down by difficulty and may include an "All" bucket. Their
+    # `count` is the number of distinct questions, `submissions` the submissions.
+    for item in counts:
+        if item.get('difficulty') == 'All':
+            return item[field]
+    return sum(item[field] for item in counts)
+
+async def _fetch_submissions_page(offset: int, limit: int, headers: dict) -> Tuple[List[dict], bool]:
     variables = {"offset": offset, "limit": limit, "questionSlug": ""}
     payload = {"query": SUBMISSIONS_QUERY, "variables": variables}
     
+    data = await _post_graphql(payload, headers=headers)
+
+    if "errors" in data:
+        if any("session" in error.get("message", "").lower() for error in data.get("errors", [])):
+            raise SessionError("Authentication failed during submission fetch.")
+        raise Exception(f"GraphQL error on page fetch: {data['errors']}")
+
+    submission_list = data.get("data", {}).get("submissionList") or {}
+    submissions = submission_list.get("submissions", [])
+    has_next = submission_list.get("hasNext", False)
+    return submissions, has_next
+
+async def _fetch_submissions_page_with_retry(offset: int, limit: int, headers: dict) -> Tuple[List[dict], bool]:
+    attempts = settings.solved_fetch_retries + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            return await _fetch_submissions_page(offset, limit, headers)
+        except SessionError:
+            raise
+        except httpx.HTTPStatusError as e:
+            # Throttling is already handled (and retried) by _post_graphql.
+            backoff = 2 ** attempt
+            if attempt == attempts:
+                raise Exception(f"HTTP error {e.response.status_code} fetching submissions at offset {offset}")
+            print(f"Warning: HTTP error on page fetch at offset {offset}: {e.response.status_code}. Retrying.")
+        except Exception as e:
+            backoff = 2 ** attempt
+            if attempt == attempts:
+                raise Exception(f"Could not fetch submissions at offset {offset}: {e}")
+            print(f"Warning: error on page fetch at offset {offset}: {e}. Retrying.")
+        await asyncio.sleep(backoff)
+
+def _submission_id(sub: dict) -> int:
     try:
-        response = await client.post(LEETCODE_GRAPHQL_URL, json=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        return int(sub.get("id"))
+    except (TypeError, ValueError):
+        return 0
 
-        if "errors" in data:
-            if any("session" in error.get("message", "").lower() for error in data.get("errors", [])):
-                print("Warning: Authentication failed during submission fetch.")
-            else:
-                print(f"Warning: GraphQL error on page fetch: {data['errors']}")
-            return [], False
-
-        submission_list = data.get("data", {}).get("submissionList", {})
-        submissions = submission_list.get("submissions", [])
-        has_next = submission_list.get("hasNext", False)
-        return submissions, has_next
-    except httpx.HTTPStatusError as e:
-        print(f"Warning: HTTP error on page fetch: {e.response.status_code}")
-        return [], False
-    except Exception as e:
-        print(f"An unexpected error occurred during page fetch: {e}")
-        return [], False
+def _high_water_mark(submissions: list) -> dict:
+    newest = max(submissions, key=_submission_id, default=None)
+    if newest is None:
+        return {"latest_id": 0, "latest_timestamp": None}
+    return {"latest_id": _submission_id(newest), "latest_timestamp": newest.get("timestamp")}
 
-def get_solved_questions(username: str, cookie: str, is_cn: bool = False) -> List[str]:
+async def get_solved_questions(username: str, cookie: str, is_cn: bool = False, get_profile=None) -> List[str]:
     """
-    Fetches all solved questions for a given LeetCode username and session cookie.
-    Uses asyncio for concurrent fetching of initial pages.
+    Fetches the slugs of all solved questions for a given LeetCode username and session cookie.
+
+    The solved set is cached together with the newest submission seen. Within
+    solved_sync_interval it is returned as-is; after that only newer submissions
+    are fetched and merged in, and the full history is only crawled once. For
+    cache_stale_grace seconds past the interval the cached set is still returned
+    while the sync runs in the background.
+    `get_profile` lets callers share a profile they are already fetching.
     """
     if not cookie:
         raise ValueError("LEETCODE_SESSION cookie is required for this operation.")
 
     headers = {
-        "Content-Type": "application/json",
         "Cookie": f"LEETCODE_SESSION={cookie}",
-        "Referer": BASE_URL,
     }
 
-    with httpx.Client() as client:
-        profile_payload = {"query": USER_PROFILE_QUERY, "variables": {"username": username}}
-        try:
-            response = client.post(LEETCODE_GRAPHQL_URL, json=profile_payload, headers=headers, timeout=30)
-            response.raise_for_status()
-            profile_data = response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"Failed to fetch user profile: {e.response.status_code}")
+    cache_key = _session_key(username, cookie)
+    state = user_cache.get("solved", cache_key)
+    # Entries cached before solved sets were keyed by slug hold "titles"; refetch those.
+    if state is None or "slugs" not in state:
+        state = await _fetch_solved_state(username, headers, get_profile or (lambda: get_user_profile(username)))
+        return _store_solved_state(cache_key, state)
 
-    if "errors" in profile_data:
-        raise Exception(f"GraphQL error on profile fetch: {profile_data['errors']}")
-    
-    matched_user = profile_data.get("data", {}).get("matchedUser")
+    age = time.time() - state["synced_at"]
+    if age < settings.solved_sync_interval:
+        return state["slugs"]
+    if age < settings.solved_sync_interval + settings.cache_stale_grace:
+        async def sync():
+            _store_solved_state(cache_key, await _sync_solved_state(state, headers))
+        _refresh_in_background(f"solved:{cache_key}", sync)
+        return state["slugs"]
+    return _store_solved_state(cache_key, await _sync_solved_state(state, headers))
+
+def _store_solved_state(cache_key: str, state: dict) -> List[str]:
+    state["synced_at"] = time.time()
+    if state["slugs"]:
+        user_cache.set("solved", cache_key, state)
+    return state["slugs"]
+
+async def _sync_solved_state(state: dict, headers: dict) -> dict:
+    """
+    Walks submission pages newest-first until reaching the high-water mark and
+    merges newly accepted questions into the cached solved set.
+    """
+    latest_id = state["latest_id"]
+    slugs = set(state["slugs"])
+    new_submissions = []
+    limit = 20
+    offset = 0
+    has_next = True
+    while has_next:
+        submissions, has_next = await _fetch_submissions_page_with_retry(offset, limit, headers)
+        newer = [sub for sub in submissions if _submission_id(sub) > latest_id]
+        new_submissions.extend(newer)
+        if len(newer) < len(submissions):
+            break
+        offset += limit
+
+    slugs.update(question_slug(sub) for sub in new_submissions if sub["statusDisplay"] == "Accepted")
+    mark = _high_water_mark(new_submissions) if new_submissions else {
+        "latest_id": latest_id, "latest_timestamp": state.get("latest_timestamp"),
+    }
+    return dict(mark, slugs=list(slugs))
+
+async def _fetch_solved_state(username: str, headers: dict, get_profile) -> dict:
+
+    # The public profile carries the counts we need and is usually already fetched.
+    matched_user = await get_profile()
     if not matched_user:
-        raise Exception(f"User '{username}' not found.")
+        raise Exception(f"Could not fetch the profile of user '{username}'.")
+
+    total_solved = _difficulty_total(matched_user["submitStats"]["acSubmissionNum"])
+    total_submissions = _difficulty_total(matched_user["submitStats"]["totalSubmissionNum"], 'submissions')
 
-    ac_submission_num = matched_user["submitStats"]["acSubmissionNum"]
-    total_solved = sum(item['count'] for item in ac_submission_num)
-    
     if total_solved == 0:
-        return []
+        return dict(_high_water_mark([]), slugs=[])
 
-    print(f"Found {total_solved} solved questions for user {username}. Fetching titles...")
+    print(f"Found {total_solved} solved questions for user {username}. Fetching their submissions...")
 
-    return asyncio.run(_fetch_all_solved(total_solved, headers))
+    return await _fetch_all_solved(total_solved, total_submissions, headers)
 
-async def _fetch_all_solved(total_solved: int, headers: dict) -> List[str]:
+async def _fetch_all_solved(total_solved: int, total_submissions: int, headers: dict) -> dict:
+    """
+    The submission count tells us how many pages to expect, so they are fetched
+    concurrently (bounded by solved_fetch_concurrency and the page rate limiter).
+    Pages past the first one reporting hasNext=false are skipped, and a page that
+    still fails after its retries fails the whole fetch rather than returning a
+    short list.
+    """
     solved_questions: Set[str] = set()
     limit = 100
-    offset = 0
-    has_next = True
-    
-    async with httpx.AsyncClient() as client:
-        while has_next:
-            submissions, has_next = await _fetch_submissions_page(client, offset, limit, headers)
-            
-            if not submissions:
-                print(f"Warning: No submissions returned at offset {offset}.")
-            
-            for sub in submissions:
-                if sub["statusDisplay"] == "Accepted":
-                    solved_questions.add(sub["title"])
-
-            offset += limit
-
-            if offset > total_solved + (limit * 10): 
-                print("Warning: Exceeded expected number of pages by a large margin. Stopping.")
-                break
-            
-            await asyncio.sleep(0.5)
+    page_count = max(1, -(-total_submissions // limit))
+    semaphore = asyncio.Semaphore(settings.solved_fetch_concurrency)
+    last_page = None
+
+    async def fetch_page(page: int) -> Tuple[List[dict], bool]:
+        nonlocal last_page
+        async with semaphore:
+            if last_page is not None and page > last_page:
+                return [], False
+            submissions, has_next = await _fetch_submissions_page_with_retry(page * limit, limit, headers)
+            if not has_next and (last_page is None or page < last_page):
+                last_page = page
+            return submissions, has_next
+
+    tasks = [asyncio.ensure_future(fetch_page(page)) for page in range(page_count)]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        # When a page fails for good, stop the others instead of letting them keep
+        # taking scheduler tokens for a fetch that has already failed.
+        for task in tasks:
+            task.cancel()
+    pages = [submissions for submissions, _ in results]
+
+    # New submissions since the count was read push older ones onto extra pages,
+    # so follow hasNext to the end rather than trusting the count.
+    offset = page_count * limit
+    has_next = results[-1][1]
+    while has_next:
+        submissions, has_next = await _fetch_submissions_page_with_retry(offset, limit, headers)
+        if not submissions and has_next:
+            raise Exception(f"Submission list reported more pages past offset {offset} but returned none.")
+        pages.append(submissions)
+        offset += limit
+
+    for submissions in pages:
+        for sub in submissions:
+            if sub["statusDisplay"] == "Accepted":
+                solved_questions.add(question_slug(sub))
+    mark = _high_water_mark([sub for submissions in pages for sub in submissions])
 
     if len(solved_questions) < total_solved:
         print(f"Warning: Fetched {len(solved_questions)} unique solved questions, but expected a total of {total_solved}.")
@@ -336,4 +650,4 @@ async def _fetch_all_solved(total_solved: int, headers: dict) -> List[str]:
     if not solved_questions:
         print("Warning: Could not retrieve any solved questions despite finding a total count.")
 
-    return list(solved_questions)
+    return dict(mark, slugs=list(solved_questions))
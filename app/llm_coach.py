@@ -1,29 +1,81 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
 import json
-import re
 from .config import settings
 from . import analyzer
-from . import leetcode_client
+from . import metrics
+from .cache import coach_cache
+from .json_stream import ArrayItemParser
+from .prompt_builder import build_coaching_prompt
+from .snapshot import UserSnapshot
 
-genai.configure(api_key=settings.gemini_api_key)
-model = genai.GenerativeModel('gemini-1.5-flash')
+MODEL_NAME = 'gemini-1.5-flash'
+# Bump whenever the prompt wording changes so cached plans are not reused.
+PROMPT_VERSION = 2
 
-def _create_slug(title: str) -> str:
-    return re.sub(r'\W+', '-', title.lower()).strip('-')
+# Created on first use: importing the Gemini SDK takes longer than the rest of
+# the app, and only coaching requests need it.
+_model = None
+_model_loading = None
 
-def generate_coaching_plan(username: str, data_manager) -> dict:
-    user_submissions = leetcode_client.get_user_submissions(username, limit=1000)
-    solved_slugs = set()
-    if user_submissions:
-        solved_slugs = {_create_slug(sub['title']) for sub in user_submissions if sub['statusDisplay'] == 'Accepted'}
+def _load_model():
+    import google.generativeai as genai
+    genai.configure(api_key=settings.gemini_api_key)
+    return genai.GenerativeModel(MODEL_NAME)
+
+async def get_model():
+    """
+    Returns the model, loading the SDK in a thread (once, shared by concurrent
+    callers) so the import doesn't stall other requests on the event loop.
+    """
+    global _model, _model_loading
+    if _model is None:
+        if _model_loading is None:
+            _model_loading = asyncio.ensure_future(asyncio.to_thread(_load_model))
+        try:
+            with metrics.timer("coach.sdk_load"):
+                _model = await asyncio.shield(_model_loading)
+        except Exception:
+            _model_loading = None
+            raise
+    return _model
+
+def model_ready() -> bool:
+    return _model is not None
+
+def _normalize(value):
+    # Order-insensitive form of the analysis inputs, used for both the prompt and its cache key.
+    if isinstance(value, dict):
+        return {key: _normalize(value[key]) for key in sorted(value)}
+    if isinstance(value, (list, set, tuple)):
+        return sorted(_normalize(item) for item in value)
+    return value
+
+def _cache_key(username: str, inputs: dict) -> str:
+    payload = json.dumps({
+        "username": username,
+        "inputs": inputs,
+        "model": MODEL_NAME,
+        "prompt_version": PROMPT_VERSION,
+        "token_budget": settings.coach_prompt_token_budget,
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+@metrics.timed("coach.prepare")
+async def _prepare_plan(snapshot: UserSnapshot, data_manager):
+    """
+    Runs the analysis and builds the prompt. Returns (cache key, prompt, cached plan or None).
+    """
+    username = snapshot.username
+    solved_slugs = await snapshot.accepted_slugs()
     
     # print("===================SOLVEDSLUGS========================")
     # print(solved_slugs)
     # print("===================SOLVEDSLUGS========================")
 
-    topic_gaps = analyzer.analyze_topic_gaps(username, data_manager)
-    nemesis_problems = analyzer.find_nemesis_problems(username, data_manager)
-    related_problems = analyzer.find_related_problems(nemesis_problems, data_manager)
+    topic_gaps = await analyzer.analyze_topic_gaps(snapshot, data_manager)
+    nemesis_problems = await analyzer.find_nemesis_problems(snapshot, data_manager)
+    related_problems = analyzer.find_related_problems(nemesis_problems, data_manager, await snapshot.rng("related_problems"))
 
     unsolved_nemesis_problems = {slug: attempts for slug, attempts in nemesis_problems.items() if slug not in solved_slugs}
     unsolved_related_problems = {}
@@ -31,39 +83,109 @@ def generate_coaching_plan(username: str, data_manager) -> dict:
         unsolved_problems = [slug for slug in problems if slug not in solved_slugs]
         if unsolved_problems:
             unsolved_related_problems[combo] = unsolved_problems
+
+    inputs = _normalize({
+        "topic_gaps": topic_gaps,
+        "nemesis_problems": unsolved_nemesis_problems,
+        "related_problems": unsolved_related_problems,
+    })
+    topic_gaps = inputs["topic_gaps"]
+    unsolved_nemesis_problems = inputs["nemesis_problems"]
+    unsolved_related_problems = inputs["related_problems"]
+
+    # Identical inputs produce the same prompt, so the plan can be reused
+    # (this also serves the topic-gap and nemesis variants below).
+    cache_key = _cache_key(username, inputs)
+    cached_plan = coach_cache.get("coach", cache_key)
+    if cached_plan is not None:
+        return cache_key, None, cached_plan
     
-    prompt = (
-        f"You are an expert LeetCode coach. Your task is to create a personalized coaching plan for the user '{username}'.\n\n"
-        f"**Analysis Data:**\n"
-        f"1. **Topic Gaps:** Here are topics the user has not yet mastered, with suggested practice problems:\n"
-        f"{json.dumps(topic_gaps, indent=2)}\n\n"
-        f"2. **Nemesis Problems:** Here are problems the user has attempted multiple times without success:\n"
-        f"{json.dumps(unsolved_nemesis_problems, indent=2)}\n\n"
-        f"3. **Related Problems:** Here are problems related to the user's nemesis problems, grouped by topic combinations:\n"
-        f"{json.dumps(unsolved_related_problems, indent=2)}\n\n"
-        f"**Your Task:**\n"
-        f"Based on the analysis, create a structured coaching plan in JSON format. The plan should include:\n"
-        f"1. A brief, encouraging introduction.\n"
-        f"2. A 'focus_areas' array, with each element being an object containing a 'topic' and a 'reason'.\n"
-        f"3. A 'suggested_problems' array, with each element being an object containing a 'slug', 'reason', and 'difficulty'.\n"
-        f"Select a maximum of 4 focus areas and 8 suggested problems in total. Prioritize problems from the nemesis list and the related problems list."
+    build = build_coaching_prompt(
+        username, topic_gaps, unsolved_nemesis_problems, unsolved_related_problems,
+        settings.coach_prompt_token_budget,
     )
-    
+    sections = ", ".join(f"{name} {kept}/{total}" for name, (kept, total) in build.sections.items())
+    print(f"Coaching prompt for {username}: ~{build.estimated_tokens} tokens "
+          f"(budget {settings.coach_prompt_token_budget}; {sections})")
+    return cache_key, build.text, None
+
+def _parse_plan(text: str) -> dict:
+    text = text.strip()
+    # Clean the response to extract only the JSON part
+    text = text[text.find('{'):text.rfind('}')+1]
+    return json.loads(text)
+
+async def generate_coaching_plan(snapshot: UserSnapshot, data_manager) -> dict:
+    cache_key, prompt, cached_plan = await _prepare_plan(snapshot, data_manager)
+    if cached_plan is not None:
+        return cached_plan
+
     try:
         # print("===================PROMPT========================")
         # print(prompt)
         # print("===================PROMPT========================")
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        # Clean the response to extract only the JSON part
-        text = text[text.find('{'):text.rfind('}')+1]
-        
-        return json.loads(text)
+        model = await get_model()
+        with metrics.upstream_call("gemini", "generate_content"):
+            response = await asyncio.wait_for(model.generate_content_async(prompt), settings.coach_timeout)
+        plan = _parse_plan(response.text)
+    except asyncio.TimeoutError:
+        return {"error": f"Timed out generating coaching plan after {settings.coach_timeout}s"}
     except Exception as e:
         return {"error": f"Error generating coaching plan: {str(e)}"}
 
-def generate_topic_gap_report(username: str, data_manager) -> str:
-    return json.dumps(generate_coaching_plan(username, data_manager), indent=2)
+    coach_cache.set("coach", cache_key, plan)
+    return plan
+
+# Plan arrays that are streamed item by item, and the event type used for their items.
+STREAMED_ARRAYS = {"focus_areas": "focus_area", "suggested_problems": "suggested_problem"}
+
+async def stream_coaching_plan(snapshot: UserSnapshot, data_manager):
+    """
+    Async generator of coaching plan events:
+        {"type": "focus_area", "item": {...}}
+        {"type": "suggested_problem", "item": {...}}
+        {"type": "plan", "plan": {...}}        (the full plan, last)
+        {"type": "error", "error": "..."}
+    Items are forwarded as soon as Gemini has streamed each one completely.
+    """
+    cache_key, prompt, cached_plan = await _prepare_plan(snapshot, data_manager)
+    if cached_plan is not None:
+        for key, event_type in STREAMED_ARRAYS.items():
+            for item in cached_plan.get(key, []):
+                yield {"type": event_type, "item": item}
+        yield {"type": "plan", "plan": cached_plan}
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.coach_timeout
+    parser = ArrayItemParser(STREAMED_ARRAYS)
+    try:
+        model = await get_model()
+        # Timed from the request until the last chunk, including time spent
+        # forwarding items to the client.
+        with metrics.upstream_call("gemini", "stream_generate_content"):
+            response = await asyncio.wait_for(model.generate_content_async(prompt, stream=True), settings.coach_timeout)
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                except StopAsyncIteration:
+                    break
+                for key, item in parser.feed(chunk.text):
+                    yield {"type": STREAMED_ARRAYS[key], "item": item}
+        plan = _parse_plan(parser.text)
+    except asyncio.TimeoutError:
+        yield {"type": "error", "error": f"Timed out generating coaching plan after {settings.coach_timeout}s"}
+        return
+    except Exception as e:
+        yield {"type": "error", "error": f"Error generating coaching plan: {str(e)}"}
+        return
+
+    coach_cache.set("coach", cache_key, plan)
+    yield {"type": "plan", "plan": plan}
+
+async def generate_topic_gap_report(snapshot: UserSnapshot, data_manager) -> str:
+    return json.dumps(await generate_coaching_plan(snapshot, data_manager), indent=2)
 
-def generate_nemesis_problem_advice(username: str, data_manager) -> str:
-    return json.dumps(generate_coaching_plan(username, data_manager), indent=2)
+async def generate_nemesis_problem_advice(snapshot: UserSnapshot, data_manager) -> str:
+    return json.dumps(await generate_coaching_plan(snapshot, data_manager), indent=2)
@@ -1,7 +1,17 @@
-from fastapi import FastAPI, Depends, Header, Cookie, Response
-from typing import Optional
+import asyncio
+import gc
+import time
+from fastapi import FastAPI, Depends, Header, Cookie, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from app.config import settings
 from app.data_manager import DataManager
 from app import services
+from app import llm_coach
+from app import leetcode_client
+from app import metrics
+from app import refresher
 
 app = FastAPI(
     title="Conlit API",
@@ -9,20 +19,121 @@ app = FastAPI(
     version="1.0.0",
 )
 data_manager = DataManager()
+_warm_up = None
+
+def preload():
+    """
+    Loads the corpus before the server forks its workers (see gunicorn.conf.py),
+    so they all share its memory pages instead of each loading a copy.
+    """
+    data_manager.ensure_loaded()
+    # The workers' settings, not those of whoever created the state file, bound the shared rate.
+    leetcode_client.claim_rate_bounds()
+    # Keep the collector from scanning (and so copying) the shared objects in every worker.
+    gc.freeze()
 
 @app.on_event("startup")
-def startup_event():
-    data_manager.load_and_index_data()
+async def startup_event():
+    global _warm_up
+    if settings.lazy_init:
+        # Serve (e.g. /ready) right away and load the corpus off the event loop.
+        if not data_manager.loaded:
+            _warm_up = asyncio.ensure_future(asyncio.to_thread(data_manager.ensure_loaded))
+    else:
+        data_manager.ensure_loaded()
+        await leetcode_client.startup()
+    refresher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await refresher.stop()
+    await leetcode_client.shutdown()
 
-def get_data_manager():
+async def get_data_manager():
+    if not data_manager.loaded:
+        await asyncio.to_thread(data_manager.ensure_loaded)
     return data_manager
 
+class RecordTimings:
+    """
+    Per-route latency for /metrics, and a Server-Timing header breaking the
+    request down by stage (LeetCode, Gemini, analyzer steps, ...). Streaming
+    responses only report the stages finished before the body starts.
+
+    Plain ASGI rather than @app.middleware("http"): that wraps the request body
+    stream, so request.is_disconnected() would never see the client go away.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = metrics.start_request()
+        start = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                route = scope.get("route")
+                metrics.observe(
+                    metrics.HTTP_SECONDS, elapsed,
+                    route=getattr(route, "path", "unmatched"), method=scope["method"], status=str(message["status"]),
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", metrics.server_timing(elapsed).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            metrics.end_request(token)
+
+app.add_middleware(RecordTimings)
+
+async def _cancel_on_disconnect(request: Request, coro):
+    """
+    Runs a long request (e.g. coach generation), cancelling it if the client goes away.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=1.0)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                # Nobody is listening; 499 is the conventional "client closed request" status.
+                return Response(status_code=499)
+    finally:
+        if not task.done():
+            task.cancel()
+
+@app.get("/ready", include_in_schema=False)
+async def get_readiness():
+    """
+    Reports which subsystems are initialized. Ready (200) once the corpus is loaded;
+    the HTTP client and the Gemini model are created on first use if needed.
+    """
+    subsystems = {
+        "corpus": data_manager.loaded,
+        "http_client": leetcode_client.client_ready(),
+        "llm": llm_coach.model_ready(),
+    }
+    ready = data_manager.loaded
+    return JSONResponse({"ready": ready, "subsystems": subsystems}, status_code=200 if ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     return Response(status_code=204)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Welcome to the Conlit API!",
         "docs": "/docs",
@@ -31,11 +142,12 @@ def read_root():
     }
 
 @app.get("/v1/user/{username}/profile")
-def get_user_profile(username: str):
-    return services.get_user_profile(username)
+async def get_user_profile(username: str):
+    return await services.get_user_profile(username)
 
 @app.get("/v1/user/{username}/analysis")
-def get_user_analysis(
+async def get_user_analysis(
+    request: Request,
     username: str,
     coach: bool = False,
     leetcode_session_query: Optional[str] = None,
@@ -44,10 +156,13 @@ def get_user_analysis(
     dm: DataManager = Depends(get_data_manager)
 ):
     leetcode_session = leetcode_session_query or leetcode_session_cookie or leetcode_session_header
-    return services.get_full_analysis(username, coach, dm, leetcode_session)
+    if coach:
+        return await _cancel_on_disconnect(request, services.get_full_analysis(username, coach, dm, leetcode_session))
+    return await services.get_full_analysis(username, coach, dm, leetcode_session)
 
 @app.get("/v1/user/{username}/analysis/topic-gaps")
-def get_topic_gaps(
+async def get_topic_gaps(
+    request: Request,
     username: str,
     coach: bool = False,
     leetcode_session_query: Optional[str] = None,
@@ -56,10 +171,13 @@ def get_topic_gaps(
     dm: DataManager = Depends(get_data_manager)
 ):
     leetcode_session = leetcode_session_query or leetcode_session_cookie or leetcode_session_header
-    return services.get_topic_gaps_analysis(username, coach, dm, leetcode_session)
+    if coach:
+        return await _cancel_on_disconnect(request, services.get_topic_gaps_analysis(username, coach, dm, leetcode_session))
+    return await services.get_topic_gaps_analysis(username, coach, dm, leetcode_session)
 
 @app.get("/v1/user/{username}/analysis/nemesis-problems")
-def get_nemesis_problems(
+async def get_nemesis_problems(
+    request: Request,
     username: str,
     coach: bool = False,
     leetcode_session_query: Optional[str] = None,
@@ -68,4 +186,40 @@ def get_nemesis_problems(
     dm: DataManager = Depends(get_data_manager)
 ):
     leetcode_session = leetcode_session_query or leetcode_session_cookie or leetcode_session_header
-    return services.get_nemesis_problems_analysis(username, coach, dm, leetcode_session)
+    if coach:
+        return await _cancel_on_disconnect(request, services.get_nemesis_problems_analysis(username, coach, dm, leetcode_session))
+    return await services.get_nemesis_problems_analysis(username, coach, dm, leetcode_session)
+
+@app.get("/v1/user/{username}/analysis/coach/stream")
+async def stream_coaching_plan(
+    username: str,
+    leetcode_session_query: Optional[str] = None,
+    leetcode_session_cookie: Optional[str] = Cookie(None),
+    leetcode_session_header: Optional[str] = Header(None),
+    dm: DataManager = Depends(get_data_manager)
+):
+    # Newline-delimited JSON: one event per line, focus areas and suggested problems
+    # as soon as each is generated, then the full plan. Generation stops if the
+    # client disconnects.
+    leetcode_session = leetcode_session_query or leetcode_session_cookie or leetcode_session_header
+    return StreamingResponse(
+        services.stream_coaching_plan(username, dm, leetcode_session),
+        media_type="application/x-ndjson",
+    )
+
+class BatchAnalysisRequest(BaseModel):
+    usernames: List[str]
+
+@app.post("/v1/users/analysis")
+async def get_batch_analysis(body: BatchAnalysisRequest, dm: DataManager = Depends(get_data_manager)):
+    # Newline-delimited JSON, one {"username": ..., "analysis": {...}} line per user
+    # in completion order.
+    if len(body.usernames) > settings.batch_max_users:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"At most {settings.batch_max_users} usernames can be analyzed per request."},
+        )
+    return StreamingResponse(
+        services.stream_batch_analysis(body.usernames, dm),
+        media_type="application/x-ndjson",
+    )
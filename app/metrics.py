@@ -0,0 +1,193 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import re
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from in-process analyzer steps up to LLM generations.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = "conlit_stage_seconds"
+UPSTREAM_SECONDS = "conlit_upstream_request_seconds"
+UPSTREAM_REQUESTS = "conlit_upstream_requests_total"
+HTTP_SECONDS = "conlit_http_request_seconds"
+
+_METADATA = {
+    STAGE_SECONDS: ("histogram", "Wall time per stage (analyzer steps, corpus load, upstream calls); analyzer steps include waits on upstream data."),
+    UPSTREAM_SECONDS: ("histogram", "Latency of calls to LeetCode and Gemini by operation."),
+    UPSTREAM_REQUESTS: ("counter", "Calls to LeetCode and Gemini by operation and outcome."),
+    HTTP_SECONDS: ("histogram", "Latency of API requests by route."),
+}
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+# (metric name, sorted label items) -> value. Metrics are per process.
+_histograms = {}
+_counters = {}
+_caches = {}
+
+# Stage timings of the current request, for its Server-Timing header. Tasks
+# spawned by the request inherit the same dict, so their stages are included.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def observe(name: str, value: float, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = _Histogram()
+    histogram.observe(value)
+
+def increment(name: str, amount: float = 1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0) + amount
+
+def register_cache(name: str, cache):
+    """
+    Exposes a TieredCache's hit/miss stats (and hit ratio) on /metrics.
+    """
+    _caches[name] = cache
+
+def record_stage(stage: str, seconds: float):
+    observe(STAGE_SECONDS, seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        total, count = timings.get(stage, (0.0, 0))
+        timings[stage] = (total + seconds, count + 1)
+
+@contextmanager
+def timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+def timed(stage: str):
+    """
+    Decorator recording each call of a function (sync or async) as `stage`.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timer(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def upstream_call(service: str, operation: str):
+    """
+    Times a call to an upstream service and counts it by outcome: "ok", the HTTP
+    status of a failed response, "timeout", "error" or "cancelled".
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except asyncio.TimeoutError:
+        status = "timeout"
+        raise
+    except Exception as e:
+        response = getattr(e, "response", None)
+        status = str(getattr(response, "status_code", "error"))
+        raise
+    except BaseException:
+        status = "cancelled"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        observe(UPSTREAM_SECONDS, seconds, service=service, operation=operation)
+        increment(UPSTREAM_REQUESTS, service=service, operation=operation, status=status)
+        record_stage(service, seconds)
+
+def start_request():
+    return _request_timings.set({})
+
+def end_request(token):
+    _request_timings.reset(token)
+
+def server_timing(total_seconds: float) -> str:
+    """
+    Builds the Server-Timing header value for the current request.
+    """
+    entries = []
+    for stage, (seconds, count) in (_request_timings.get() or {}).items():
+        # Metric names must be HTTP tokens.
+        name = re.sub(r"[^\w.-]", "_", stage)
+        description = f';desc="{count} calls"' if count > 1 else ""
+        entries.append(f"{name}{description};dur={seconds * 1000:.1f}")
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def render() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (kind, description) in _METADATA.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(_counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (metric, labels), histogram in sorted(_histograms.items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+    lines.append("# HELP conlit_cache_requests_total Cache lookups by cache, kind and outcome.")
+    lines.append("# TYPE conlit_cache_requests_total counter")
+    ratios = []
+    for cache_name, cache in sorted(_caches.items()):
+        for kind, outcomes in sorted(cache.stats.items()):
+            for outcome, count in sorted(outcomes.items()):
+                labels = (("cache", cache_name), ("kind", kind), ("outcome", outcome))
+                lines.append(f"conlit_cache_requests_total{_format_labels(labels)} {count}")
+            total = sum(outcomes.values())
+            hits = sum(count for outcome, count in outcomes.items() if outcome.endswith("_hits"))
+            if total:
+                ratios.append(((("cache", cache_name), ("kind", kind)), hits / total))
+    lines.append("# HELP conlit_cache_hit_ratio Fraction of cache lookups served from any tier.")
+    lines.append("# TYPE conlit_cache_hit_ratio gauge")
+    for labels, ratio in ratios:
+        lines.append(f"conlit_cache_hit_ratio{_format_labels(labels)} {ratio}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+import json
+import math
+from typing import NamedTuple
+
+# Rough local estimate for Gemini/GPT-style tokenizers on English text and JSON.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _compact(value) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+class PromptBuild(NamedTuple):
+    text: str
+    estimated_tokens: int
+    # Number of entries kept / available per section, e.g. {"nemesis_problems": (5, 9)}
+    sections: dict
+
+TEMPLATE = (
+    "You are an expert LeetCode coach. Your task is to create a personalized coaching plan for the user '{username}'.\n\n"
+    "**Analysis Data:**\n"
+    "1. **Nemesis Problems:** problems the user has attempted multiple times without success (slug: attempts):\n"
+    "{nemesis_problems}\n\n"
+    "2. **Related Problems:** problems related to the user's nemesis problems, grouped by topic combinations:\n"
+    "{related_problems}\n\n"
+    "3. **Topic Gaps:** topics the user has not yet mastered, with suggested practice problems:\n"
+    "{topic_gaps}\n\n"
+    "**Your Task:**\n"
+    "Based on the analysis, create a structured coaching plan in JSON format. The plan should include:\n"
+    "1. A brief, encouraging introduction.\n"
+    "2. A 'focus_areas' array, with each element being an object containing a 'topic' and a 'reason'.\n"
+    "3. A 'suggested_problems' array, with each element being an object containing a 'slug', 'reason', and 'difficulty'.\n"
+    "Select a maximum of 4 focus areas and 8 suggested problems in total. Prioritize problems from the nemesis list and the related problems list."
+)
+
+def _ranked_sections(topic_gaps: dict, nemesis_problems: dict, related_problems: dict) -> dict:
+    """
+    Returns each section as a ranked list of (key, value) entries, with every
+    slug kept only in its highest-priority section (nemesis > related > topic gaps).
+    """
+    nemesis = sorted(
+        ((slug, attempts) for slug, attempts in nemesis_problems.items() if isinstance(attempts, int)),
+        key=lambda item: (-item[1], item[0]),
+    )
+    seen = {slug for slug, _ in nemesis}
+
+    related = []
+    for combo, slugs in related_problems.items():
+        unique = [slug for slug in dict.fromkeys(slugs) if slug not in seen]
+        if unique:
+            related.append((combo, unique))
+            seen.update(unique)
+    # Combinations with more practice material first.
+    related.sort(key=lambda item: (-len(item[1]), item[0]))
+
+    gaps = []
+    for topic, slugs in topic_gaps.items():
+        if not isinstance(slugs, list):
+            continue
+        unique = [slug for slug in dict.fromkeys(slugs) if slug not in seen]
+        if unique:
+            gaps.append((topic, unique))
+            seen.update(unique)
+
+    return {"nemesis_problems": nemesis, "related_problems": related, "topic_gaps": gaps}
+
+def build_coaching_prompt(username: str, topic_gaps: dict, nemesis_problems: dict,
+                          related_problems: dict, token_budget: int) -> PromptBuild:
+    """
+    Builds the coaching prompt with compactly serialized inputs, deduplicated
+    across sections and truncated to fit the token budget. Entries are added one
+    per section in turn, in rank order, so no single section crowds out the others.
+    """
+    ranked = _ranked_sections(topic_gaps, nemesis_problems, related_problems)
+    empty = {name: _compact({}) for name in ranked}
+    used = estimate_tokens(TEMPLATE.format(username=username, **empty))
+
+    kept = {name: {} for name in ranked}
+    cursors = {name: 0 for name in ranked}
+    active = [name for name in ranked if ranked[name]]
+    while active and used < token_budget:
+        for name in list(active):
+            key, value = ranked[name][cursors[name]]
+            cursors[name] += 1
+            # Each entry costs its own serialization plus a separator.
+            cost = estimate_tokens(_compact({key: value})) + 1
+            if used + cost <= token_budget:
+                kept[name][key] = value
+                used += cost
+            if cursors[name] >= len(ranked[name]):
+                active.remove(name)
+
+    text = TEMPLATE.format(username=username, **{name: _compact(kept[name]) for name in kept})
+    sections = {name: (len(kept[name]), len(ranked[name])) for name in ranked}
+    return PromptBuild(text, estimate_tokens(text), sections)
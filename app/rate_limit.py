@@ -0,0 +1,189 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Priority classes, most urgent first.
+INTERACTIVE = 0
+BACKGROUND = 1
+CRAWL = 2
+
+# Fraction of the burst capacity a request of each class must leave in the bucket,
+# so background refreshes and crawls (also those of other processes sharing the
+# state file) never drain the tokens that interactive requests need.
+RESERVE = {INTERACTIVE: 0.0, BACKGROUND: 0.25, CRAWL: 0.5}
+
+_priority = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int):
+    """
+    Sends the enclosed upstream requests, and those of tasks spawned inside, at `level`.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def retry_after_seconds(response, default: float) -> float:
+    """
+    Parses a Retry-After header (delta seconds or HTTP date), falling back to `default`.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class UpstreamScheduler:
+    """
+    Gate for every request to one upstream. A token bucket allows `rate` requests
+    per second with bursts of up to `capacity`. The rate adapts (AIMD): it creeps
+    up by `increase` after each success and halves when the upstream throttles us,
+    which also pauses all requests for the Retry-After delay. Waiting requests are
+    served by priority class, then in arrival order.
+
+    With `state_file`, the bucket is kept in that file (under flock) and shared by
+    every process using it, e.g. all API workers and the crawler. The file is then
+    accessed in a thread, so waiting for another process's lock doesn't stall the
+    event loop, and rate increases are batched into the next token acquisition.
+    The bucket's capacity and rate bounds are stored with it by the process that
+    creates it, and apply to every process sharing it.
+    """
+    def __init__(self, rate: float, min_rate: float, max_rate: float, capacity: float = None,
+                 increase: float = 0.1, state_file: str = None):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.increase = increase
+        if state_file and fcntl is None:
+            print("Warning: file locking is unavailable on this platform; the upstream rate limit is per process.")
+            state_file = None
+        self.state_file = state_file
+        self._initial_rate = rate
+        self._state = self._new_state()
+        self._waiters = []
+        self._arrivals = itertools.count()
+        # Rate increase earned by successes since the bucket state was last updated.
+        self._pending_increase = 0.0
+
+    def _new_state(self) -> dict:
+        return {"tokens": self.capacity, "updated": time.time(), "paused_until": 0.0, "rate": self._initial_rate,
+                "capacity": self.capacity, "min_rate": self.min_rate, "max_rate": self.max_rate}
+
+    def _update(self, change):
+        """
+        Applies change(state) to the bucket, under the file lock when it is shared.
+        """
+        if not self.state_file:
+            return change(self._state)
+        with open(self.state_file, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "null") or self._new_state()
+            except json.JSONDecodeError:
+                state = self._new_state()
+            # State files written before the bounds were shared lack them.
+            for key, value in self._new_state().items():
+                state.setdefault(key, value)
+            result = change(state)
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            f.flush()
+        return result
+
+    def claim_bounds(self):
+        """
+        Makes this scheduler's capacity and rate bounds those of the shared bucket,
+        e.g. when the server starts with new settings and an old state file.
+        """
+        def apply(state):
+            state.update(capacity=self.capacity, min_rate=self.min_rate, max_rate=self.max_rate)
+        self._update(apply)
+
+    async def _off_loop(self, func, *args):
+        # A shared state file may be locked by another process: wait for it in a thread.
+        if not self.state_file:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def _rate(self, state: dict) -> float:
+        # Processes sharing a state file may be configured with different bounds:
+        # only the shared ones count, so none of them drags the others down to its own.
+        return min(state["max_rate"], max(state["min_rate"], state["rate"]))
+
+    def _take(self, level: int, increase: float = 0.0) -> float:
+        """
+        Takes a token if one is available to `level`; otherwise returns the seconds to wait.
+        `increase` is added to the rate first.
+        """
+        def take(state):
+            if increase:
+                state["rate"] = min(state["max_rate"], self._rate(state) + increase)
+            now = time.time()
+            if now < state["paused_until"]:
+                return state["paused_until"] - now
+            rate = self._rate(state)
+            capacity = state["capacity"]
+            state["tokens"] = min(capacity, state["tokens"] + (now - state["updated"]) * rate)
+            state["updated"] = now
+            needed = min(capacity, 1 + RESERVE[level] * capacity)
+            if state["tokens"] >= needed:
+                state["tokens"] -= 1
+                return 0.0
+            return (needed - state["tokens"]) / rate
+        return self._update(take)
+
+    async def acquire(self, level: int = None):
+        """
+        Waits for a token. `level` defaults to the priority of the current context.
+        """
+        if level is None:
+            level = _priority.get()
+        waiter = (level, next(self._arrivals), asyncio.Event())
+        heapq.heappush(self._waiters, waiter)
+        try:
+            while True:
+                # Only the most urgent waiter takes tokens; the others wait their turn.
+                if self._waiters[0] is not waiter:
+                    await waiter[2].wait()
+                    waiter[2].clear()
+                    continue
+                increase, self._pending_increase = self._pending_increase, 0.0
+                delay = await self._off_loop(self._take, level, increase)
+                if delay <= 0:
+                    return
+                await asyncio.sleep(delay)
+        finally:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            if self._waiters:
+                self._waiters[0][2].set()
+
+    def on_success(self):
+        self._pending_increase += self.increase
+
+    async def on_throttle(self, retry_after: float):
+        def back_off(state):
+            state["rate"] = max(state["min_rate"], self._rate(state) / 2)
+            state["paused_until"] = max(state["paused_until"], time.time() + retry_after)
+        self._pending_increase = 0.0
+        await self._off_loop(self._update, back_off)
@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import time
+from .config import settings
+from .cache import user_cache
+from . import leetcode_client
+from . import metrics
+from . import rate_limit
+from .snapshot import UserSnapshot
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Request counts halve every hour, so popularity follows current usage.
+POPULARITY_HALF_LIFE = 3600
+# Usernames whose decayed count falls below this are forgotten.
+MIN_SCORE = 0.05
+# What the analyses read for every user, and so what gets re-warmed.
+SECTIONS = ("profile", "submissions")
+
+# Decayed request count per username, per process.
+_scores = {}
+_task = None
+_lock_file = None
+
+def record_request(username: str):
+    _scores[username] = _scores.get(username, 0.0) + 1.0
+
+def popular_usernames(limit: int) -> list:
+    return heapq.nlargest(limit, _scores, key=_scores.get)
+
+def _decay(elapsed: float):
+    factor = 0.5 ** (elapsed / POPULARITY_HALF_LIFE)
+    for username in list(_scores):
+        _scores[username] *= factor
+        if _scores[username] < MIN_SCORE:
+            del _scores[username]
+
+async def refresh_popular() -> int:
+    """
+    Re-fetches the cached sections of the most requested users that are missing
+    or would expire before the next run. Returns how many users were refreshed.
+    """
+    limit = UserSnapshot.SUBMISSION_LIMIT
+    horizon = 2 * settings.refresh_interval
+    due = {}
+    for username in popular_usernames(settings.refresh_top_users):
+        sections = []
+        for section in SECTIONS:
+            remaining = user_cache.remaining_ttl(section, leetcode_client.section_cache_key(section, username, limit))
+            if remaining is None or remaining < horizon:
+                sections.append(section)
+        if sections:
+            due[username] = sections
+
+    usernames = list(due)
+    size = settings.batch_query_size
+    for i in range(0, len(usernames), size):
+        chunk = {username: due[username] for username in usernames[i:i + size]}
+        await leetcode_client.get_users_data(chunk, limit=limit, refresh=True)
+    return len(due)
+
+def _is_leader() -> bool:
+    """
+    With refresh_lock_file, only the process holding its lock refreshes. The
+    others retry every cycle, so one takes over if the leader exits. Popularity
+    is then sampled from the leader's share of the traffic.
+    """
+    global _lock_file
+    if not settings.refresh_lock_file or fcntl is None or _lock_file is not None:
+        return True
+    f = open(settings.refresh_lock_file, 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _lock_file = f
+    return True
+
+async def _run():
+    last_run = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.refresh_interval)
+        now = time.monotonic()
+        _decay(now - last_run)
+        last_run = now
+        if not _is_leader():
+            continue
+        try:
+            with metrics.timer("refresher.cycle"), rate_limit.priority(rate_limit.BACKGROUND):
+                refreshed = await refresh_popular()
+            if refreshed:
+                print(f"Refreshed cached data of {refreshed} popular users")
+        except Exception as e:
+            print(f"Warning: background refresh failed: {e}")
+
+def start():
+    """
+    Starts the periodic refresh on the running event loop (no-op if disabled).
+    """
+    global _task
+    if settings.refresh_interval > 0 and (_task is None or _task.done()):
+        _task = asyncio.ensure_future(_run())
+
+async def stop():
+    global _task, _lock_file
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    if _lock_file is not None:
+        _lock_file.close()
+        _lock_file = None
@@ -1,39 +1,117 @@
+import asyncio
+import json
+from app.config import settings
 from app.data_manager import DataManager
 from app import analyzer
 from app import llm_coach
 from app import leetcode_client
+from app import refresher
+from app.snapshot import UserSnapshot
 
-def get_user_profile(username: str):
+async def get_user_profile(username: str):
     """
     Get a user's LeetCode profile.
     """
-    return leetcode_client.get_user_profile(username)
+    refresher.record_request(username)
+    return await leetcode_client.get_user_profile(username)
 
-def get_full_analysis(username: str, coach: bool, data_manager: DataManager, leetcode_session: str = None):
+async def _run_section(name: str, coro, timeout: float):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        print(f"Warning: analysis section '{name}' timed out after {timeout}s")
+        return {"error": f"Timed out computing {name}."}
+    except Exception as e:
+        print(f"An error occurred computing analysis section '{name}': {e}")
+        return {"error": f"Could not compute {name}: {e}"}
+
+async def get_full_analysis(username: str, coach: bool, data_manager: DataManager, leetcode_session: str = None):
     """
     Get a full analysis for a user, with an option for AI coaching.
     """
+    refresher.record_request(username)
+    snapshot = UserSnapshot(username, leetcode_session)
     if coach:
-        return llm_coach.generate_coaching_plan(username, data_manager)
-    
-    return {
-        "performance_summary": analyzer.generate_performance_summary(username, data_manager),
-        "topic_gaps": analyzer.analyze_topic_gaps(username, data_manager, leetcode_session),
-        "nemesis_problems": analyzer.find_nemesis_problems(username, data_manager, leetcode_session)
+        return await llm_coach.generate_coaching_plan(snapshot, data_manager)
+    return await _analyze_snapshot(snapshot, data_manager)
+
+async def _analyze_snapshot(snapshot: UserSnapshot, data_manager: DataManager) -> dict:
+    snapshot.prefetch("profile", "submissions")
+    # Sections run concurrently and share the snapshot's upstream requests. A
+    # section that fails or times out is reported as an error on its own key
+    # while the others are still returned.
+    sections = {
+        "performance_summary": analyzer.generate_performance_summary(snapshot, data_manager),
+        "topic_gaps": analyzer.analyze_topic_gaps(snapshot, data_manager),
+        "nemesis_problems": analyzer.find_nemesis_problems(snapshot, data_manager)
     }
+    timeout = settings.analysis_section_timeout
+    results = await asyncio.gather(*(_run_section(name, coro, timeout) for name, coro in sections.items()))
+    return dict(zip(sections.keys(), results))
 
-def get_topic_gaps_analysis(username: str, coach: bool, data_manager: DataManager, leetcode_session: str = None):
+async def get_topic_gaps_analysis(username: str, coach: bool, data_manager: DataManager, leetcode_session: str = None):
     """
     Get topic gaps analysis, with an option for AI coaching.
     """
+    refresher.record_request(username)
+    snapshot = UserSnapshot(username, leetcode_session)
     if coach:
-        return llm_coach.generate_topic_gap_report(username, data_manager)
-    return analyzer.analyze_topic_gaps(username, data_manager, leetcode_session)
+        return await llm_coach.generate_topic_gap_report(snapshot, data_manager)
+    return await analyzer.analyze_topic_gaps(snapshot, data_manager)
 
-def get_nemesis_problems_analysis(username: str, coach: bool, data_manager: DataManager, leetcode_session: str = None):
+async def get_nemesis_problems_analysis(username: str, coach: bool, data_manager: DataManager, leetcode_session: str = None):
     """
     Get nemesis problems analysis, with an option for AI coaching.
     """
+    refresher.record_request(username)
+    snapshot = UserSnapshot(username, leetcode_session)
     if coach:
-        return llm_coach.generate_nemesis_problem_advice(username, data_manager)
-    return analyzer.find_nemesis_problems(username, data_manager, leetcode_session)
+        return await llm_coach.generate_nemesis_problem_advice(snapshot, data_manager)
+    return await analyzer.find_nemesis_problems(snapshot, data_manager)
+
+async def stream_coaching_plan(username: str, data_manager: DataManager, leetcode_session: str = None):
+    """
+    Stream a coaching plan as newline-delimited JSON events.
+    """
+    refresher.record_request(username)
+    snapshot = UserSnapshot(username, leetcode_session)
+    async for event in llm_coach.stream_coaching_plan(snapshot, data_manager):
+        yield json.dumps(event) + "\n"
+
+async def _analyze_batch_member(username: str, batch, data_manager: DataManager, semaphore: asyncio.Semaphore):
+    snapshot = UserSnapshot(username)
+    for section, value in (await batch).get(username, {}).items():
+        snapshot.prime(section, value)
+    async with semaphore:
+        return username, await _analyze_snapshot(snapshot, data_manager)
+
+async def stream_batch_analysis(usernames: list, data_manager: DataManager):
+    """
+    Analyze several users, yielding one JSON line per user as each analysis completes.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    for username in usernames:
+        refresher.record_request(username)
+    size = settings.batch_query_size
+    # Every chunk of users is fetched with one combined query; each user's analysis
+    # starts as soon as its own chunk has arrived.
+    batches = [
+        asyncio.ensure_future(leetcode_client.get_users_data(
+            {username: ["profile", "submissions"] for username in usernames[i:i + size]},
+            limit=UserSnapshot.SUBMISSION_LIMIT,
+        ))
+        for i in range(0, len(usernames), size)
+    ]
+    semaphore = asyncio.Semaphore(settings.batch_analysis_concurrency)
+    members = [
+        asyncio.ensure_future(_analyze_batch_member(username, batches[i // size], data_manager, semaphore))
+        for i, username in enumerate(usernames)
+    ]
+    try:
+        for member in asyncio.as_completed(members):
+            username, analysis = await member
+            yield json.dumps({"username": username, "analysis": analysis}) + "\n"
+    finally:
+        # Stop outstanding work if the consumer goes away (e.g. the client disconnects).
+        for task in batches + members:
+            task.cancel()
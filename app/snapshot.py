@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import random
+from . import leetcode_client
+from .data_manager import question_slug
+
+class UserSnapshot:
+    """
+    Request-scoped view of a user's LeetCode data.
+
+    Every upstream query is issued at most once per snapshot, no matter how many
+    analysis steps need it, and concurrent callers share the same in-flight request.
+    """
+    SUBMISSION_LIMIT = 1000
+
+    def __init__(self, username: str, leetcode_session: str = None, submission_limit: int = SUBMISSION_LIMIT):
+        self.username = username
+        self.leetcode_session = leetcode_session
+        self.submission_limit = submission_limit
+        self._tasks = {}
+        self._submission_counts = None
+        self._fingerprint = None
+
+    def _once(self, key: str, fetch):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._tasks[key] = task
+        # Shield the shared fetch so a caller that times out or is cancelled
+        # doesn't cancel it for the other sections waiting on the same data.
+        return asyncio.shield(task)
+
+    def prime(self, key: str, value):
+        """
+        Seeds data fetched elsewhere (e.g. by a batched query) so it isn't requested again.
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._tasks[key] = future
+
+    def _fetch(self, section: str):
+        if section == "profile":
+            return leetcode_client.get_user_profile(self.username)
+        if section == "submissions":
+            return leetcode_client.get_user_submissions(self.username, limit=self.submission_limit)
+        return leetcode_client.get_user_contest_history(self.username)
+
+    def prefetch(self, *sections: str):
+        """
+        Requests every given section not yet fetched in one combined query, instead
+        of one query per section when the analysis first needs it.
+        """
+        missing = [section for section in sections if section not in self._tasks]
+        if len(missing) < 2:
+            return
+        combined = asyncio.ensure_future(
+            leetcode_client.get_users_data({self.username: missing}, limit=self.submission_limit)
+        )
+        for section in missing:
+            self._tasks[section] = asyncio.ensure_future(self._from_combined(combined, section))
+
+    async def _from_combined(self, combined, section: str):
+        fetched = (await asyncio.shield(combined)).get(self.username, {})
+        if section not in fetched:
+            # The combined request failed; fall back to the standalone query.
+            return await self._fetch(section)
+        return fetched[section]
+
+    async def profile(self):
+        return await self._once("profile", lambda: self._fetch("profile"))
+
+    async def submissions(self) -> list:
+        return await self._once("submissions", lambda: self._fetch("submissions"))
+
+    async def contest_history(self):
+        return await self._once("contest_history", lambda: self._fetch("contest_history"))
+
+    async def submission_count(self):
+        # The profile query already carries totalSubmissionNum, so reuse it
+        # instead of sending a separate submission count query.
+        profile = await self.profile()
+        if not profile:
+            return None
+        total_submission_num = profile.get("submitStats", {}).get("totalSubmissionNum", [])
+        return sum(item['count'] for item in total_submission_num)
+
+    async def submission_counts(self) -> dict:
+        """
+        Per-slug attempt aggregation of the recent submissions:
+        {slug: {'accepted': bool, 'attempts': int}}.
+        """
+        if self._submission_counts is None:
+            submission_counts = {}
+            for sub in await self.submissions():
+                slug = question_slug(sub)
+                if slug not in submission_counts:
+                    submission_counts[slug] = {'accepted': False, 'attempts': 0}
+                submission_counts[slug]['attempts'] += 1
+                if sub['statusDisplay'] == 'Accepted':
+                    submission_counts[slug]['accepted'] = True
+            self._submission_counts = submission_counts
+        return self._submission_counts
+
+    async def accepted_slugs(self) -> set:
+        return {slug for slug, data in (await self.submission_counts()).items() if data['accepted']}
+
+    async def rng(self, purpose: str) -> random.Random:
+        """
+        Random generator seeded from the user's submissions, so sampled suggestions
+        stay the same while the user's data is unchanged (which also keeps the
+        coach cache keys stable).
+        """
+        if self._fingerprint is None:
+            counts = await self.submission_counts()
+            summary = sorted((slug, data['attempts'], data['accepted']) for slug, data in counts.items())
+            self._fingerprint = hashlib.sha256(json.dumps([self.username, summary]).encode()).hexdigest()
+        return random.Random(f"{self._fingerprint}:{purpose}")
@@ -0,0 +1,84 @@
+"""
+Synthetic question corpus in the format written by scripts/fetch_all_questions.py.
+
+    python -m bench.corpus --contests 800 --out /tmp/bench/all_contests_questions.json
+"""
+import argparse
+import json
+import random
+
+TOPICS = [
+    "Array", "String", "Hash Table", "Dynamic Programming", "Math", "Sorting", "Greedy",
+    "Depth-First Search", "Binary Search", "Database", "Breadth-First Search", "Tree",
+    "Matrix", "Two Pointers", "Bit Manipulation", "Binary Tree", "Heap (Priority Queue)",
+    "Stack", "Prefix Sum", "Graph", "Simulation", "Design", "Counting", "Backtracking",
+    "Sliding Window", "Union Find", "Linked List", "Ordered Set", "Monotonic Stack",
+    "Enumeration", "Recursion", "Trie", "Divide and Conquer", "Bitmask", "Queue",
+    "Memoization", "Topological Sort", "Geometry", "Segment Tree", "Game Theory",
+    "Hash Function", "Binary Indexed Tree", "Interactive", "String Matching",
+    "Rolling Hash", "Shortest Path", "Combinatorics", "Number Theory",
+]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+DIFFICULTY_WEIGHTS = [1, 2, 1]
+
+def question_slug(number: int) -> str:
+    return f"synthetic-problem-{number}"
+
+def generate_corpus(contests: int, questions_per_contest: int = 4, seed: int = 0) -> dict:
+    """
+    Returns {contest slug: contest} with deterministic, realistically shaped questions.
+    """
+    rng = random.Random(seed)
+    corpus = {}
+    number = 0
+    for index in range(contests):
+        contest_slug = f"weekly-contest-{index + 1}"
+        questions = []
+        for _ in range(questions_per_contest):
+            number += 1
+            questions.append({
+                "questionId": str(number),
+                "questionFrontendId": str(number),
+                "title": f"Synthetic Problem {number}",
+                "titleSlug": question_slug(number),
+                "content": "<p>" + "Lorem ipsum dolor sit amet. " * rng.randint(20, 80) + "</p>",
+                "likes": rng.randint(0, 5000),
+                "dislikes": rng.randint(0, 500),
+                "stats": json.dumps({"totalAccepted": str(rng.randint(1000, 100000))}),
+                "similarQuestions": "[]",
+                "categoryTitle": "Algorithms",
+                "hints": ["Think about the constraints."] * rng.randint(0, 3),
+                "topicTags": [{"name": topic} for topic in rng.sample(TOPICS, rng.randint(1, 6))],
+                "companyTags": None,
+                "difficulty": rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0],
+                "isPaidOnly": False,
+                "solution": None,
+                "hasSolution": False,
+                "hasVideoSolution": False,
+            })
+        corpus[contest_slug] = {
+            "title": f"Weekly Contest {index + 1}",
+            "titleSlug": contest_slug,
+            "startTime": 1600000000 + index * 7 * 24 * 3600,
+            "questions": questions,
+        }
+    return corpus
+
+def write_corpus(path: str, contests: int, questions_per_contest: int = 4, seed: int = 0) -> list:
+    """
+    Writes the corpus as a single JSON file and returns the question slugs.
+    """
+    corpus = generate_corpus(contests, questions_per_contest, seed)
+    with open(path, 'w') as f:
+        json.dump(corpus, f)
+    return [question["titleSlug"] for contest in corpus.values() for question in contest["questions"]]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic question corpus.")
+    parser.add_argument("--contests", type=int, default=800)
+    parser.add_argument("--questions-per-contest", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data/all_contests_questions.json")
+    args = parser.parse_args()
+    slugs = write_corpus(args.out, args.contests, args.questions_per_contest, args.seed)
+    print(f"Wrote {len(slugs)} questions in {args.contests} contests to {args.out}")
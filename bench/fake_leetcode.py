@@ -0,0 +1,161 @@
+"""
+Local stand-in for the LeetCode GraphQL endpoint. It answers the queries sent
+by app/leetcode_client.py, including the combined aliased ones, with synthetic
+per-user data or with recorded responses, after a configurable latency.
+
+    python -m bench.fake_leetcode --port 8765 --latency 0.05 --corpus data/all_contests_questions.json
+    LEETCODE_GRAPHQL_URL=http://127.0.0.1:8765/graphql uvicorn app.main:app
+
+Recorded responses are JSON lines of {"operationName", "variables", "response"}
+and take precedence over synthetic data when the operation and variables match.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# `alias: field(username: $var` in both single-user and combined queries
+USER_FIELD = re.compile(r'(?:(\w+)\s*:\s*)?(\w+)\(username:\s*\$(\w+)')
+
+def _replay_key(operation_name, variables) -> str:
+    return json.dumps([operation_name, variables or {}], sort_keys=True)
+
+def load_recordings(path: str) -> dict:
+    recordings = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                recordings[_replay_key(entry.get("operationName"), entry.get("variables"))] = entry["response"]
+    return recordings
+
+class SyntheticUsers:
+    """
+    Deterministic submission histories drawn from the corpus slugs: the same
+    username always gets the same data.
+    """
+    def __init__(self, slugs: list, submissions_per_user: int = 200):
+        self.slugs = slugs or [f"synthetic-problem-{i}" for i in range(1, 101)]
+        self.submissions_per_user = submissions_per_user
+        self._users = {}
+
+    def submissions(self, username: str) -> list:
+        if username not in self._users:
+            rng = random.Random(username)
+            attempted = rng.sample(self.slugs, min(len(self.slugs), self.submissions_per_user // 2 or 1))
+            submissions = []
+            for i in range(self.submissions_per_user):
+                slug = rng.choice(attempted)
+                submissions.append({
+                    "id": str(10 ** 9 - i),
+                    "title": slug.replace("-", " ").title(),
+                    "titleSlug": slug,
+                    "timestamp": str(1700000000 - i * 3600),
+                    "statusDisplay": "Accepted" if rng.random() < 0.4 else "Wrong Answer",
+                    "lang": "python3",
+                    "url": f"/submissions/detail/{10 ** 9 - i}/",
+                })
+            self._users[username] = submissions
+        return self._users[username]
+
+    def profile(self, username: str) -> dict:
+        submissions = self.submissions(username)
+        accepted = [sub["titleSlug"] for sub in submissions if sub["statusDisplay"] == "Accepted"]
+        attempted = {sub["titleSlug"] for sub in submissions}
+        return {
+            "username": username,
+            "profile": {
+                "realName": username, "websites": [], "countryName": None, "company": None,
+                "school": None, "aboutMe": "", "reputation": 0, "ranking": 100000,
+            },
+            "submitStats": {
+                # Like LeetCode: `count` is distinct questions, `submissions` every attempt.
+                "acSubmissionNum": [{"difficulty": "All", "count": len(set(accepted)), "submissions": len(accepted)}],
+                "totalSubmissionNum": [{"difficulty": "All", "count": len(attempted), "submissions": len(submissions)}],
+            },
+        }
+
+    def contest_ranking(self, username: str) -> dict:
+        return {"attendedContestsCount": 3, "rating": 1550.0, "globalRanking": 100000,
+                "totalParticipants": 500000, "topPercentage": 20.0}
+
+    def contest_history(self, username: str) -> list:
+        return [
+            {"attended": True, "trendDirection": "UP", "problemsSolved": 2, "totalProblems": 4,
+             "finishTimeInSeconds": 3600, "rating": 1500.0 + i * 25, "ranking": 5000,
+             "contest": {"title": f"Weekly Contest {i + 1}", "startTime": 1600000000 + i * 604800}}
+            for i in range(3)
+        ]
+
+def create_app(slugs: list = None, latency: float = 0.0, jitter: float = 0.0,
+               recordings: dict = None, submissions_per_user: int = 200) -> FastAPI:
+    app = FastAPI(title="Fake LeetCode GraphQL")
+    users = SyntheticUsers(slugs, submissions_per_user)
+    recordings = recordings or {}
+    app.state.requests = 0
+
+    def resolve(query: str, variables: dict) -> dict:
+        data = {}
+        for alias, field, variable in USER_FIELD.findall(query):
+            username = variables.get(variable)
+            if field == "matchedUser":
+                value = users.profile(username)
+            elif field == "recentSubmissionList":
+                value = users.submissions(username)[:variables.get("limit", 20)]
+            elif field == "userContestRanking":
+                value = users.contest_ranking(username)
+            elif field == "userContestRankingHistory":
+                value = users.contest_history(username)
+            else:
+                continue
+            data[alias or field] = value
+        return data
+
+    @app.post("/graphql")
+    async def graphql(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        if latency or jitter:
+            await asyncio.sleep(latency + random.uniform(0, jitter))
+
+        recorded = recordings.get(_replay_key(body.get("operationName"), body.get("variables")))
+        if recorded is not None:
+            return JSONResponse(recorded)
+
+        query = body.get("query", "")
+        variables = body.get("variables") or {}
+        if "submissionList(offset" in query:
+            # The session-only paginated list; the fake treats the session cookie as
+            # the name of the user it belongs to.
+            username = request.cookies.get("LEETCODE_SESSION", "")
+            submissions = users.submissions(username)
+            offset, limit = variables.get("offset", 0), variables.get("limit", 20)
+            page = submissions[offset:offset + limit]
+            return {"data": {"submissionList": {"hasNext": offset + limit < len(submissions), "submissions": page}}}
+        return {"data": resolve(query, variables)}
+
+    return app
+
+if __name__ == '__main__':
+    import uvicorn
+    from bench.corpus import question_slug
+
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the LeetCode GraphQL API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many seconds.")
+    parser.add_argument("--corpus", help="Corpus JSON to draw submission slugs from.")
+    parser.add_argument("--questions", type=int, default=3200, help="Synthetic slug count when no corpus is given.")
+    parser.add_argument("--replay", help="JSON lines of recorded responses to serve.")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, 'r') as f:
+            slugs = [q["titleSlug"] for contest in json.load(f).values() for q in contest["questions"]]
+    else:
+        slugs = [question_slug(number) for number in range(1, args.questions + 1)]
+    recordings = load_recordings(args.replay) if args.replay else None
+    uvicorn.run(create_app(slugs, args.latency, args.jitter, recordings), host="127.0.0.1", port=args.port)
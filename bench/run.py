@@ -0,0 +1,293 @@
+"""
+Offline benchmark suite. Generates a synthetic corpus, serves LeetCode's GraphQL
+API from a local stand-in (bench/fake_leetcode.py) and times the corpus load,
+the analyzer steps and full analyses against it. Results are written as JSON so
+runs can be compared across releases.
+
+Run from the repository root:
+
+    python -m bench.run --contests 800 --iterations 20 --latency 0.02 --out bench-results.json
+
+It also times a cold `import app.main` in fresh interpreters and exits with
+status 1 when that exceeds --import-budget (or the Gemini SDK gets imported).
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench.corpus import write_corpus
+from bench.fake_leetcode import SyntheticUsers, create_app, load_recordings
+
+def _summary(name: str, samples: list, **extra) -> dict:
+    ms = sorted(sample * 1000 for sample in samples)
+    result = {
+        "name": name,
+        "iterations": len(ms),
+        "mean_ms": statistics.mean(ms),
+        "median_ms": statistics.median(ms),
+        "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+        "min_ms": ms[0],
+        "max_ms": ms[-1],
+    }
+    result.update(extra)
+    print(f"{name:<40} median {result['median_ms']:9.3f} ms   p95 {result['p95_ms']:9.3f} ms", file=sys.stderr)
+    return result
+
+def measure(name: str, fn, iterations: int, warmup: int = 1, **extra) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _summary(name, samples, **extra)
+
+async def measure_async(name: str, make_coro, iterations: int, warmup: int = 1, **extra) -> dict:
+    for i in range(warmup):
+        await make_coro(-1 - i)
+    samples = []
+    for i in range(iterations):
+        coro = make_coro(i)
+        start = time.perf_counter()
+        await coro
+        samples.append(time.perf_counter() - start)
+    return _summary(name, samples, **extra)
+
+class FakeServer:
+    """
+    Runs the fake GraphQL app with uvicorn on a free local port in a background thread.
+    """
+    def __init__(self, app):
+        import uvicorn
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/graphql"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+def configure_environment(workdir: str, graphql_url: str):
+    # Settings are read once at import, so this must run before importing app.
+    os.environ.update({
+        "LEETCODE_GRAPHQL_URL": graphql_url,
+        "QUESTION_DATA_PATH": os.path.join(workdir, "all_contests_questions.json"),
+        "CORPUS_STORE_DIR": os.path.join(workdir, "corpus"),
+        "CORPUS_INDEX_PATH": os.path.join(workdir, "corpus.idx"),
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+    })
+    for key, value in {
+        "GEMINI_API_KEY": "offline-benchmark",
+        "DEPLOYED_BASE_URL": "http://127.0.0.1",
+        "LOCAL_BASE_URL": "http://127.0.0.1",
+        "USERNAME": "bench-user",
+        # The fake server never throttles, so don't let the upstream scheduler either.
+        "UPSTREAM_RATE": "10000",
+        "UPSTREAM_MAX_RATE": "10000",
+        "UPSTREAM_BURST": "10000",
+    }.items():
+        os.environ.setdefault(key, value)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import app.main\n"
+    "print(time.perf_counter() - start, 'google.generativeai' in sys.modules)\n"
+)
+
+def measure_import(iterations: int, budget: float) -> dict:
+    """
+    Times `import app.main` in fresh interpreters, as paid by a cold start.
+    """
+    samples = []
+    sdk_loaded = False
+    for _ in range(iterations):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_PROBE], cwd=REPO_ROOT, text=True,
+                                         stderr=subprocess.DEVNULL)
+        seconds, loaded = output.split()
+        samples.append(float(seconds))
+        sdk_loaded = sdk_loaded or loaded == "True"
+    result = _summary("import app.main", samples, budget_ms=budget * 1000, gemini_sdk_imported=sdk_loaded)
+    result["within_budget"] = result["median_ms"] <= budget * 1000 and not sdk_loaded
+    return result
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT,
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_async_benchmarks(args, data_manager, users: SyntheticUsers, fake_app) -> list:
+    from app import analyzer, leetcode_client, services
+    from app.snapshot import UserSnapshot
+
+    def primed_snapshot(username: str) -> UserSnapshot:
+        snapshot = UserSnapshot(username)
+        snapshot.prime("profile", users.profile(username))
+        snapshot.prime("submissions", users.submissions(username))
+        return snapshot
+
+    results = []
+    try:
+        results.append(await measure_async(
+            "analyze_topic_gaps",
+            lambda i: analyzer.analyze_topic_gaps(primed_snapshot(f"user-{i}"), data_manager),
+            args.iterations,
+        ))
+        results.append(await measure_async(
+            "find_nemesis_problems",
+            lambda i: analyzer.find_nemesis_problems(primed_snapshot(f"user-{i}"), data_manager),
+            args.iterations,
+        ))
+
+        snapshot = primed_snapshot("related-user")
+        nemesis = await analyzer.find_nemesis_problems(snapshot, data_manager)
+        rng = await snapshot.rng("related_problems")
+        results.append(measure(
+            "find_related_problems",
+            lambda: analyzer.find_related_problems(nemesis, data_manager, rng),
+            args.iterations,
+            nemesis_problems=len(nemesis),
+        ))
+
+        # Full analyses go through the HTTP client to the fake server. A new user
+        # per iteration misses the cache; repeating one user measures cache hits.
+        requests_before = fake_app.state.requests
+        results.append(await measure_async(
+            "get_full_analysis[cold]",
+            lambda i: services.get_full_analysis(f"cold-user-{i}", False, data_manager),
+            args.iterations,
+            latency_ms=args.latency * 1000,
+        ))
+        results[-1]["upstream_requests_per_analysis"] = (
+            (fake_app.state.requests - requests_before) / (args.iterations + 1)
+        )
+        results.append(await measure_async(
+            "get_full_analysis[warm]",
+            lambda i: services.get_full_analysis("warm-user", False, data_manager),
+            args.iterations,
+        ))
+
+        async def batch(i: int):
+            usernames = [f"batch-{i}-user-{n}" for n in range(args.users)]
+            async for _ in services.stream_batch_analysis(usernames, data_manager):
+                pass
+        requests_before = fake_app.state.requests
+        results.append(await measure_async(
+            "stream_batch_analysis",
+            batch,
+            max(1, args.iterations // 5),
+            users=args.users,
+            latency_ms=args.latency * 1000,
+        ))
+        results[-1]["upstream_requests_per_batch"] = (
+            (fake_app.state.requests - requests_before) / (results[-1]["iterations"] + 1)
+        )
+    finally:
+        await leetcode_client.shutdown()
+    return results
+
+def main(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="conlit-bench-")
+    try:
+        return _run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _run(args, workdir: str) -> dict:
+    corpus_path = os.path.join(workdir, "all_contests_questions.json")
+    slugs = write_corpus(corpus_path, args.contests, args.questions_per_contest, args.seed)
+    users = SyntheticUsers(slugs, args.submissions_per_user)
+    recordings = load_recordings(args.replay) if args.replay else None
+    fake_app = create_app(slugs, args.latency, args.jitter, recordings, args.submissions_per_user)
+
+    with FakeServer(fake_app) as server:
+        configure_environment(workdir, server.url)
+        from app.data_manager import DataManager
+
+        results = []
+
+        def load(use_index: bool):
+            DataManager().load_and_index_data(use_index=use_index)
+
+        results.append(measure(
+            "load_and_index_data[json]", lambda: load(False), args.load_iterations, questions=len(slugs),
+        ))
+        data_manager = DataManager()
+        data_manager.load_and_index_data(use_index=False)
+        data_manager.write_index()
+        results.append(measure(
+            "load_and_index_data[index]", lambda: load(True), args.load_iterations, questions=len(slugs),
+        ))
+
+        results.extend(asyncio.run(run_async_benchmarks(args, data_manager, users, fake_app)))
+        results.append(measure_import(args.load_iterations, args.import_budget))
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+        },
+        "benchmarks": results,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--contests", type=int, default=800, help="Synthetic corpus size in contests.")
+    parser.add_argument("--questions-per-contest", type=int, default=4)
+    parser.add_argument("--submissions-per-user", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--load-iterations", type=int, default=3)
+    parser.add_argument("--users", type=int, default=50, help="Users per batch analysis.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--replay", help="JSON lines of recorded GraphQL responses to serve.")
+    parser.add_argument("--import-budget", type=float, default=0.75, help="Seconds a cold `import app.main` may take.")
+    parser.add_argument("--out", default="bench-results.json", help="Where to write the JSON results ('-' for stdout).")
+    args = parser.parse_args()
+
+    report = main(args)
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote results to {args.out}", file=sys.stderr)
+
+    import_check = next(result for result in report["benchmarks"] if result["name"] == "import app.main")
+    if not import_check["within_budget"]:
+        print(f"Import of app.main is over its {args.import_budget}s budget or loads the Gemini SDK.", file=sys.stderr)
+        sys.exit(1)
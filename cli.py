@@ -1,17 +1,27 @@
 import typer
 import json
+import asyncio
+from typing import List, Optional
 from app.data_manager import DataManager
 from app import services
-import pdb
+from app import leetcode_client
 
 app = typer.Typer()
 
+def _run(coro):
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await leetcode_client.shutdown()
+    return asyncio.run(runner())
+
 @app.command()
 def user_profile(username: str):
     """
     Get a user's LeetCode profile.
     """
-    profile = services.get_user_profile(username)
+    profile = _run(services.get_user_profile(username))
     if profile:
         print(json.dumps(profile, indent=2))
     else:
@@ -25,8 +35,63 @@ def analyze(username: str, coach: bool = typer.Option(False, "--coach", help="Ge
     data_manager = DataManager()
     data_manager.load_and_index_data()
     
-    result = services.get_full_analysis(username, coach, data_manager)
+    result = _run(services.get_full_analysis(username, coach, data_manager))
     print(json.dumps(result, indent=2))
 
+@app.command()
+def analyze_batch(
+    usernames: List[str] = typer.Argument(None, help="Usernames to analyze."),
+    file: Optional[str] = typer.Option(None, "--file", help="File with one username per line."),
+):
+    """
+    Run analysis for several users, printing one JSON line per user as each completes.
+    """
+    usernames = list(usernames or [])
+    if file:
+        with open(file, 'r') as f:
+            usernames.extend(line.strip() for line in f if line.strip())
+    if not usernames:
+        print("No usernames given.")
+        raise typer.Exit(code=1)
+
+    data_manager = DataManager()
+    data_manager.load_and_index_data()
+
+    async def stream():
+        async for line in services.stream_batch_analysis(usernames, data_manager):
+            print(line, end="", flush=True)
+    _run(stream())
+
+@app.command()
+def build_index():
+    """
+    Build the precompiled corpus index from the question data.
+    """
+    from app.config import settings
+    data_manager = DataManager()
+    data_manager.load_and_index_data(use_index=False)
+
+    if not data_manager.questions:
+        print("No questions found in the corpus; index not written.")
+        raise typer.Exit(code=1)
+    data_manager.write_index()
+    print(f"Wrote index for {len(data_manager.questions)} questions to {settings.corpus_index_path}")
+
+@app.command()
+def compact_corpus(export_json: bool = typer.Option(False, "--export-json", help="Also write the legacy single-file JSON corpus.")):
+    """
+    Compact the segmented corpus store.
+    """
+    from app.config import settings
+    from app.corpus_store import CorpusStore
+    store = CorpusStore(settings.corpus_store_dir)
+    if not store.exists():
+        print(f"No corpus store found in {settings.corpus_store_dir}")
+        raise typer.Exit(code=1)
+    print(f"Compacted manifest to {store.compact()} contests.")
+    if export_json:
+        store.export_json(settings.question_data_path)
+        print(f"Exported corpus to {settings.question_data_path}")
+
 if __name__ == "__main__":
     app()
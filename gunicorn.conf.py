@@ -0,0 +1,31 @@
+"""
+Production server configuration:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app and its question corpus are loaded once in the master process before
+the uvicorn workers are forked, so workers start without reading the corpus
+and initially share its pages copy-on-write. Pages that requests touch (e.g.
+reference counts of question records) are copied per worker, so memory still
+grows with the worker count: measure RSS before raising WEB_CONCURRENCY.
+"""
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+# Deliberately small and explicit: cpu_count() reports the host's cores inside
+# a CPU-limited container, and every worker holds its own caches.
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+if workers > 1:
+    # Read by the app's settings, which are loaded after this file. Workers share
+    # one upstream rate limit, and only one of them runs the background refresher.
+    os.environ.setdefault("UPSTREAM_STATE_FILE", os.path.join(tempfile.gettempdir(), "conlit-upstream.state"))
+    os.environ.setdefault("REFRESH_LOCK_FILE", os.path.join(tempfile.gettempdir(), "conlit-refresher.lock"))
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked.
+    from app.main import preload
+    preload()
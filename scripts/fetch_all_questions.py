@@ -1,14 +1,87 @@
 #!/usr/bin/python
+"""
+Crawls every LeetCode contest and the details of its questions into the
+append-only corpus store in STORE_DIR (see app/corpus_store.py).
+
+Run from the repository root:
+
+    python -m scripts.fetch_all_questions --concurrency 4 --rate 2
+
+With --state-file (defaulting to UPSTREAM_STATE_FILE), the crawl shares its rate
+limit with the API workers using the same file and yields to their requests.
+
+Question details are appended to CHECKPOINT_FILE as soon as they are fetched,
+so an interrupted crawl resumes without re-fetching any question. Contests from
+the legacy single-file STORAGE_FILE are imported into the store on first run.
+"""
+import argparse
+import asyncio
 import httpx
 import json
 import os
-import time
 
+from app.corpus_store import CorpusStore
+from app.rate_limit import CRAWL, UpstreamScheduler, retry_after_seconds
+
+LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql"
 STORAGE_FILE = 'data/all_contests_questions.json'
+STORE_DIR = 'data/corpus'
+CHECKPOINT_FILE = 'data/questions_checkpoint.jsonl'
+
+MAX_ATTEMPTS = 5
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Content-Type': 'application/json'
+}
+
+class Crawler:
+    def __init__(self, client: httpx.AsyncClient, concurrency: int, rate: float, state_file: str = None):
+        self.client = client
+        self.scheduler = UpstreamScheduler(rate, min_rate=min(0.5, rate), max_rate=rate, state_file=state_file)
+        self.workers = asyncio.Semaphore(concurrency)
+        # titleSlug -> details, for questions already fetched (this run or a checkpoint)
+        self.questions = load_checkpoint()
+        # titleSlug -> in-flight fetch, so a question shared by contests is fetched once
+        self._pending = {}
 
-def get_all_contests():
-    try:
-        leetcode_url = "https://leetcode.com/graphql"
+    async def post(self, payload: dict, description: str):
+        """
+        Sends a GraphQL request through the upstream scheduler at crawl priority,
+        honouring 429/Retry-After and retrying server errors with exponential backoff.
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            async with self.workers:
+                await self.scheduler.acquire(CRAWL)
+                try:
+                    response = await self.client.post(LEETCODE_GRAPHQL_URL, json=payload)
+                except httpx.TransportError as e:
+                    response = None
+                    error = e
+
+            backoff = 2 ** attempt
+            if response is None:
+                print(f"Network error for {description} (attempt {attempt}): {error}")
+            elif response.status_code == 429:
+                delay = retry_after_seconds(response, backoff)
+                print(f"Rate limited on {description}; pausing for {delay:.1f}s")
+                await self.scheduler.on_throttle(delay)
+                continue
+            elif response.status_code >= 500:
+                print(f"HTTP Error for {description} (attempt {attempt}): {response.status_code}")
+            else:
+                response.raise_for_status()
+                self.scheduler.on_success()
+                return response.json()
+            await asyncio.sleep(backoff)
+        raise Exception(f"Giving up on {description} after {MAX_ATTEMPTS} attempts")
+
+    async def get_all_contests(self):
         query = """
         query {
             allContests {
@@ -18,43 +91,55 @@ def get_all_contests():
             }
         }
         """
-        
-        payload = {
-            "query": query
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Content-Type': 'application/json'
-        }
-
-        response = httpx.post(leetcode_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if "errors" in data:
-            print(f"GraphQL Errors for contests: {data['errors']}")
+        try:
+            data = await self.post({"query": query}, "contest list")
+            if "errors" in data:
+                print(f"GraphQL Errors for contests: {data['errors']}")
+                return []
+            return data.get("data", {}).get("allContests", [])
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP Error fetching contests: {e.response.status_code} - {e.response.text}")
             return []
-            
-        all_contests = data.get("data", {}).get("allContests", [])
-        return all_contests
-
-    except httpx.HTTPStatusError as e:
-        print(f"HTTP Error fetching contests: {e.response.status_code} - {e.response.text}")
-        return []
-    except Exception as e:
-        print(f"An error occurred fetching contests: {e}")
-        return []
-
-def get_question_details(title_slug):
-    try:
-        leetcode_url = "https://leetcode.com/graphql"
+        except Exception as e:
+            print(f"An error occurred fetching contests: {e}")
+            return []
+
+    async def get_contest_questions(self, contest_slug):
+        query = """query contestInfo($titleSlug: String!) {
+            contest(titleSlug: $titleSlug) {
+                title
+                questions {
+                    title
+                    titleSlug
+                }
+            }
+        }"""
+        payload = {"query": query, "variables": {"titleSlug": contest_slug}}
+        try:
+            data = await self.post(payload, contest_slug)
+            if "errors" in data:
+                print(f"GraphQL Errors: {data['errors']}")
+                return None
+
+            contest_data = data.get("data", {}).get("contest")
+            if not contest_data:
+                print(f"Contest not found: {contest_slug}")
+                return None
+            return contest_data.get("questions")
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP Error: {e.response.status_code} - {e.response.text}")
+            return None
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    async def _fetch_question_details(self, title_slug):
         query = """query questionData($titleSlug: String!) {
             question(titleSlug: $titleSlug) {
                 questionId
                 questionFrontendId
                 title
+                titleSlug
                 content
                 likes
                 dislikes
@@ -71,150 +156,126 @@ def get_question_details(title_slug):
                 hasVideoSolution
             }
         }"""
-        
-        payload = {
-            "query": query,
-            "variables": {"titleSlug": title_slug}
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Content-Type': 'application/json'
-        }
-
-        response = httpx.post(leetcode_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if "errors" in data:
-            print(f"GraphQL Errors for {title_slug}: {data['errors']}")
+        payload = {"query": query, "variables": {"titleSlug": title_slug}}
+        try:
+            data = await self.post(payload, title_slug)
+            if "errors" in data:
+                print(f"GraphQL Errors for {title_slug}: {data['errors']}")
+                return None
+            details = data.get("data", {}).get("question")
+        except httpx.HTTPStatusError as e:
+            print(f"HTTP Error for {title_slug}: {e.response.status_code} - {e.response.text}")
+            return None
+        except Exception as e:
+            print(f"An error occurred for {title_slug}: {e}")
             return None
-            
-        question_data = data.get("data", {}).get("question")
-        return question_data
-
-    except httpx.HTTPStatusError as e:
-        print(f"HTTP Error for {title_slug}: {e.response.status_code} - {e.response.text}")
-        return None
-    except Exception as e:
-        print(f"An error occurred for {title_slug}: {e}")
-        return None
-
-def get_contest_questions(contest_slug):
-    try:
-        leetcode_url = "https://leetcode.com/graphql"
-        query = """query contestInfo($titleSlug: String!) {
-            contest(titleSlug: $titleSlug) {
-                title
-                questions {
-                    title
-                    titleSlug
-                }
-            }
-        }"""
-        
-        variables = {
-            "titleSlug": contest_slug
-        }
-        
-        payload = {
-            "query": query,
-            "variables": variables
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Content-Type': 'application/json'
-        }
 
-        response = httpx.post(leetcode_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if "errors" in data:
-            print(f"GraphQL Errors: {data['errors']}")
+        if details:
+            self.questions[title_slug] = details
+            append_checkpoint(title_slug, details)
+        return details
+
+    async def get_question_details(self, title_slug):
+        if title_slug in self.questions:
+            return self.questions[title_slug]
+        task = self._pending.get(title_slug)
+        if task is None:
+            print(f"--- Fetching details for: {title_slug} ---")
+            task = asyncio.ensure_future(self._fetch_question_details(title_slug))
+            self._pending[title_slug] = task
+        try:
+            return await task
+        finally:
+            self._pending.pop(title_slug, None)
+
+    async def crawl_contest(self, contest):
+        contest_slug = contest['titleSlug']
+        questions = await self.get_contest_questions(contest_slug)
+        if not questions:
+            print(f"No questions found for contest '{contest_slug}', skipping.")
             return None
-            
-        contest_data = data.get("data", {}).get("contest")
-        if not contest_data:
-            print("Contest not found.")
+
+        print(f"Found {len(questions)} questions for contest '{contest_slug}'.")
+        details = await asyncio.gather(*(self.get_question_details(q['titleSlug']) for q in questions))
+        if not all(details):
+            # Leave the contest out so the next run retries it; the questions
+            # that did succeed are already in the checkpoint.
+            print(f"Some question details are missing for '{contest_slug}', will retry on the next run.")
             return None
-            
-        questions = contest_data.get("questions")
-        
-        return questions
+        for question, detail in zip(questions, details):
+            detail.setdefault("titleSlug", question['titleSlug'])
 
-    except httpx.HTTPStatusError as e:
-        print(f"HTTP Error: {e.response.status_code} - {e.response.text}")
-        return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
+        return {
+            "title": contest['title'],
+            "titleSlug": contest['titleSlug'],
+            "startTime": contest['startTime'],
+            "questions": list(details)
+        }
 
-def load_stored_data():
+def open_store():
+    store = CorpusStore(STORE_DIR)
     if os.path.exists(STORAGE_FILE):
-        with open(STORAGE_FILE, 'r') as f:
+        try:
+            imported = store.import_json(STORAGE_FILE)
+            if imported:
+                print(f"Imported {imported} contests from {STORAGE_FILE} into {STORE_DIR}.")
+        except json.JSONDecodeError:
+            print(f"Warning: Could not parse {STORAGE_FILE}; not importing it.")
+    return store
+
+def load_checkpoint():
+    questions = {}
+    if not os.path.exists(CHECKPOINT_FILE):
+        return questions
+    with open(CHECKPOINT_FILE, 'r') as f:
+        for line in f:
             try:
-                return json.load(f)
+                entry = json.loads(line)
             except json.JSONDecodeError:
-                return {}
-    return {}
+                # A crash mid-append can leave a truncated last line.
+                continue
+            questions[entry["titleSlug"]] = entry["details"]
+    print(f"Resuming with {len(questions)} question details from {CHECKPOINT_FILE}.")
+    return questions
 
-def save_data(data):
-    os.makedirs(os.path.dirname(STORAGE_FILE), exist_ok=True)
-    with open(STORAGE_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+def append_checkpoint(title_slug, details):
+    os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+    with open(CHECKPOINT_FILE, 'a') as f:
+        f.write(json.dumps({"titleSlug": title_slug, "details": details}) + "\n")
 
-if __name__ == '__main__':
-    stored_data = load_stored_data()
-    all_contests = get_all_contests()
+async def main(concurrency: int, rate: float, state_file: str = None):
+    store = open_store()
+    stored_contests = store.read_manifest()
+
+    async with httpx.AsyncClient(headers=HEADERS, timeout=30) as client:
+        crawler = Crawler(client, concurrency, rate, state_file)
+        all_contests = await crawler.get_all_contests()
+
+        if not all_contests:
+            print("Could not retrieve contest list. Exiting.")
+            return
 
-    if not all_contests:
-        print("Could not retrieve contest list. Exiting.")
-    else:
         print(f"Found {len(all_contests)} contests.")
-        for contest in all_contests:
-            contest_slug = contest['titleSlug']
-            if contest_slug in stored_data:
-                print(f"Skipping '{contest_slug}', already fetched.")
-                continue
+        pending = [contest for contest in all_contests if contest['titleSlug'] not in stored_contests]
+        print(f"Skipping {len(all_contests) - len(pending)} contests already fetched.")
 
-            print(f"\nFetching questions for contest: '{contest_slug}'")
-            questions = get_contest_questions(contest_slug)
-            
-            if questions:
-                print(f"Found {len(questions)} questions for contest '{contest_slug}'.")
-                contest_with_questions = {
-                    "title": contest['title'],
-                    "titleSlug": contest['titleSlug'],
-                    "startTime": contest['startTime'],
-                    "questions": []
-                }
+        tasks = [asyncio.ensure_future(crawler.crawl_contest(contest)) for contest in pending]
+        for task in asyncio.as_completed(tasks):
+            contest_with_questions = await task
+            if contest_with_questions:
+                contest_slug = contest_with_questions["titleSlug"]
+                store.append_contest(contest_with_questions, contest_with_questions["questions"])
+                print(f"Successfully fetched and stored data for '{contest_slug}'.")
+
+    print("\nAll contests processed.")
+    print("Run `python cli.py build-index` to refresh the precompiled corpus index.")
 
-                for q in questions:
-                    print(f"--- Fetching details for: {q['title']} ---")
-                    details = get_question_details(q['titleSlug'])
-                    if details:
-                        contest_with_questions["questions"].append(details)
-                    time.sleep(1)  # delay for rate-limiting
-                
-                if contest_with_questions["questions"]:
-                    stored_data[contest_slug] = contest_with_questions
-                    save_data(stored_data)
-                    print(f"Successfully fetched and stored data for '{contest_slug}'.")
-                else:
-                    print(f"No question details found for '{contest_slug}', skipping.")
-
-        print("\nAll contests processed.")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fetch all LeetCode contest questions.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of requests in flight.")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum requests per second. With --state-file, "
+                        "the shared bucket's limits apply unless the crawler creates it.")
+    parser.add_argument("--state-file", default=os.environ.get("UPSTREAM_STATE_FILE"),
+                        help="Rate-limit state file shared with the API workers.")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.rate, args.state_file))
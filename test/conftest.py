@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+# Settings are read when the app modules are imported; give the required ones
+# placeholder values and keep the caches out of the real cache directory.
+for key, value in {
+    "GEMINI_API_KEY": "test",
+    "DEPLOYED_BASE_URL": "http://test",
+    "LOCAL_BASE_URL": "http://test",
+    "USERNAME": "test",
+}.items():
+    os.environ.setdefault(key, value)
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="conlit-test-cache-")
+
+collect_ignore = ["test_api.py"]
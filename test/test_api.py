@@ -1,6 +1,7 @@
 import requests
 import json
 import os
+import shutil
 import sys
 from dotenv import load_dotenv
 
@@ -67,6 +68,41 @@ def test_api():
         response = requests.get(nemesis_coach_url)
         print_response(response)
 
+        # Test streaming coach endpoint (newline-delimited JSON events)
+        print("Testing /v1/user/{username}/analysis/coach/stream")
+        stream_url = f"{BASE_URL}/v1/user/{USERNAME}/analysis/coach/stream"
+        with requests.get(stream_url, stream=True) as response:
+            print(f"Status Code: {response.status_code}")
+            for line in response.iter_lines():
+                if line:
+                    print(json.loads(line))
+        print("-" * 40)
+
+        # Test readiness endpoint (which subsystems are initialized)
+        print("Testing /ready")
+        response = requests.get(f"{BASE_URL}/ready")
+        print(f"Status Code: {response.status_code}")
+        print(response.json())
+        print("-" * 40)
+
+        # Test metrics endpoint (Prometheus text format)
+        print("Testing /metrics")
+        response = requests.get(f"{BASE_URL}/metrics")
+        print(f"Status Code: {response.status_code}")
+        print(f"Server-Timing: {response.headers.get('Server-Timing')}")
+        print("\n".join(line for line in response.text.splitlines() if not line.startswith("#"))[:2000])
+        print("-" * 40)
+
+        # Test batch analysis endpoint (newline-delimited JSON, one line per user)
+        print("Testing POST /v1/users/analysis")
+        batch_url = f"{BASE_URL}/v1/users/analysis"
+        with requests.post(batch_url, json={"usernames": [USERNAME]}, stream=True) as response:
+            print(f"Status Code: {response.status_code}")
+            for line in response.iter_lines():
+                if line:
+                    print(json.loads(line))
+        print("-" * 40)
+
     # --- Tests with leetcode_session cookie ---
     if LEETCODE_SESSION:
         print("\n--- Testing with leetcode_session and caching ---")
@@ -107,9 +143,9 @@ if __name__ == "__main__":
     if (len(sys.argv) > 1 and sys.argv[1] == "not-normal") or (len(sys.argv) > 2 and sys.argv[2] == "not-normal"):
         CHECK_NORMAL = False
         
-    cache_file = f"/tmp/cache/{USERNAME}_data.json"
-    if os.path.exists(cache_file):
-        os.remove(cache_file)
-        print(f"Cleared cache file: {cache_file}")
+    cache_dir = os.getenv("cache_dir", "/tmp/cache")
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+        print(f"Cleared cache directory: {cache_dir}")
         
     test_api()
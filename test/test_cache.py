@@ -0,0 +1,65 @@
+import os
+import pytest
+from app import cache
+from app.cache import DiskStore, LRUCache, TieredCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+def test_ttl_and_stale_grace(clock):
+    tiered = TieredCache([LRUCache(10)], {"profile": 10}, grace=5)
+    tiered.set("profile", "alice", {"name": "alice"})
+    clock[0] += 9
+    assert tiered.get("profile", "alice") == {"name": "alice"}
+    assert tiered.remaining_ttl("profile", "alice") == 1
+
+    clock[0] += 3
+    assert tiered.get("profile", "alice") is None
+    assert tiered.get_stale("profile", "alice") == ({"name": "alice"}, True)
+
+    clock[0] += 3
+    assert tiered.get_stale("profile", "alice") == (None, False)
+    assert tiered.remaining_ttl("profile", "alice") is None
+    assert tiered.stats["profile"] == {"memory_hits": 1, "misses": 2, "memory_stale_hits": 1}
+
+def test_zero_ttl_is_not_cached(clock):
+    tiered = TieredCache([LRUCache(10)], {"profile": 0})
+    tiered.set("profile", "alice", {"name": "alice"})
+    assert tiered.get("profile", "alice") is None
+
+def test_disk_hits_are_promoted_to_memory(clock, tmp_path):
+    memory = LRUCache(10)
+    disk = DiskStore(str(tmp_path), 1 << 20)
+    TieredCache([LRUCache(10), disk], {"profile": 60}).set("profile", "alice", [1, 2])
+
+    tiered = TieredCache([memory, disk], {"profile": 60})
+    assert tiered.get("profile", "alice") == [1, 2]
+    assert memory.get("profile:alice") == (1060.0, [1, 2])
+    assert tiered.get("profile", "alice") == [1, 2]
+    assert tiered.stats["profile"] == {"disk_hits": 1, "memory_hits": 1}
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(2)
+    lru.set("a", (0, 1))
+    lru.set("b", (0, 2))
+    lru.get("a")
+    lru.set("c", (0, 3))
+    assert lru.get("b") is None
+    assert lru.get("a") == (0, 1) and lru.get("c") == (0, 3)
+
+def test_disk_store_evicts_oldest_files_over_the_cap(tmp_path):
+    disk = DiskStore(str(tmp_path), max_bytes=1000)
+    for i in range(4):
+        disk.set(f"key-{i}", (0, "x" * 200))
+        # Distinct, increasing mtimes so eviction order is deterministic.
+        os.utime(disk._path(f"key-{i}"), (i, i))
+    assert all(disk.get(f"key-{i}") is not None for i in range(4))
+
+    disk.set("key-4", (0, "x" * 200))
+    assert disk.get("key-0") is None
+    assert disk.get("key-4") == (0, "x" * 200)
+    assert disk._current_size() <= 900
+    assert sum(os.path.getsize(path) for path, _, _ in disk._scan()) == disk._current_size()
@@ -0,0 +1,78 @@
+import json
+from app import corpus_index
+from app.config import settings
+from app.data_manager import DataManager
+
+CORPUS = {
+    "weekly-contest-1": {"title": "Weekly Contest 1", "questions": [
+        {"title": "Two Sum", "titleSlug": "two-sum", "difficulty": "Easy",
+         "topicTags": [{"name": "Array"}, {"name": "Hash Table"}]},
+        {"title": "Pascal's Triangle", "difficulty": "Easy", "topicTags": [{"name": "Array"}]},
+        {"title": "Word Ladder", "titleSlug": "word-ladder", "difficulty": "Hard",
+         "topicTags": [{"name": "Breadth-First Search"}, {"name": "Hash Table"}]},
+    ]},
+    "weekly-contest-2": {"title": "Weekly Contest 2", "questions": [
+        # Appears again: the latest copy's topics win.
+        {"title": "Two Sum", "titleSlug": "two-sum", "difficulty": "Easy", "topicTags": [{"name": "Array"}]},
+        {"title": "Pow(x, n)", "titleSlug": "powx-n", "difficulty": "Medium", "topicTags": [{"name": "Math"}]},
+        None,
+    ]},
+}
+
+def _setup(monkeypatch, tmp_path, corpus=CORPUS):
+    json_path = tmp_path / "questions.json"
+    json_path.write_text(json.dumps(corpus))
+    monkeypatch.setattr(settings, "question_data_path", str(json_path))
+    monkeypatch.setattr(settings, "corpus_store_dir", str(tmp_path / "no-store"))
+    monkeypatch.setattr(settings, "corpus_index_path", str(tmp_path / "corpus.idx"))
+    return json_path
+
+def _load(use_index=True) -> DataManager:
+    dm = DataManager()
+    dm.load_and_index_data(use_index)
+    return dm
+
+def _snapshot(dm: DataManager) -> dict:
+    return {
+        "questions": [(q.id, q.slug, q.title, q.difficulty, q.topic_ids, q.contest_slug) for q in dm.questions],
+        "by_slug": {slug: q.id for slug, q in dm.questions_by_slug.items()},
+        "topics": dm.topics,
+        "topic_bitsets": dm.topic_bitsets,
+        "difficulty_bitsets": dm.difficulty_bitsets,
+        "topic_candidates": dm.topic_candidates,
+    }
+
+def test_index_round_trip_matches_the_json_scan(monkeypatch, tmp_path):
+    json_path = _setup(monkeypatch, tmp_path)
+    scanned = _load(use_index=False)
+    scanned.write_index()
+    # Without its source the index is still used, so this can only come from the index.
+    json_path.unlink()
+
+    indexed = _load()
+
+    assert _snapshot(indexed) == _snapshot(scanned)
+    assert indexed.get_topic_candidates("Array", "Easy") == (0, 1)
+    assert indexed.get_question_ids(["pascals-triangle", "powx-n", "unknown"]) == {1, 3}
+
+def test_index_of_another_format_version_falls_back_to_json(monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path)
+    _load(use_index=False).write_index()
+    monkeypatch.setattr(corpus_index, "FORMAT_VERSION", corpus_index.FORMAT_VERSION + 1)
+
+    assert corpus_index.read_index(settings.corpus_index_path, settings.question_data_path) is None
+    assert _snapshot(_load()) == _snapshot(_load(use_index=False))
+
+def test_stale_index_falls_back_to_json(monkeypatch, tmp_path):
+    json_path = _setup(monkeypatch, tmp_path)
+    _load(use_index=False).write_index()
+
+    updated = dict(CORPUS, **{"weekly-contest-3": {"title": "Weekly Contest 3", "questions": [
+        {"title": "Jump Game", "titleSlug": "jump-game", "difficulty": "Medium", "topicTags": [{"name": "Greedy"}]},
+    ]}})
+    json_path.write_text(json.dumps(updated))
+
+    assert corpus_index.read_index(settings.corpus_index_path, str(json_path)) is None
+    dm = _load()
+    assert "jump-game" in dm.questions_by_slug
+    assert _snapshot(dm) == _snapshot(_load(use_index=False))
@@ -0,0 +1,28 @@
+import json
+from app.corpus_store import CorpusStore
+from app.data_manager import question_slug
+
+def _contest(slug):
+    return {"title": slug.title(), "titleSlug": slug, "startTime": 0}
+
+def test_append_after_a_torn_manifest_line(tmp_path):
+    store = CorpusStore(str(tmp_path))
+    store.append_contest(_contest("c1"), [{"title": "Q1"}])
+    with open(store.manifest_path, 'a') as f:
+        f.write('{"title": "C2", "titleSl')  # crash mid-append
+    store.append_contest(_contest("c3"), [{"title": "Q3"}])
+
+    assert list(store.read_manifest()) == ["c1", "c3"]
+    assert [list(questions) for _, questions in store.iter_contests()] == [[{"title": "Q1"}], [{"title": "Q3"}]]
+
+def test_legacy_questions_get_leetcode_slugs(tmp_path):
+    # Older corpus files have no titleSlug; LeetCode drops the punctuation.
+    legacy = [{"title": "Pascal's Triangle"}, {"title": "Pow(x, n)"}, {"title": "Two Sum II - Input Array Is Sorted"}]
+    expected = ["pascals-triangle", "powx-n", "two-sum-ii-input-array-is-sorted"]
+    assert [question_slug(q) for q in legacy] == expected
+
+    path = tmp_path / "questions.json"
+    path.write_text(json.dumps({"c1": {"title": "C1", "questions": legacy}}))
+    store = CorpusStore(str(tmp_path / "store"))
+    assert store.import_json(str(path)) == 1
+    assert [q["titleSlug"] for q in store.iter_questions("c1")] == expected
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from app import main, services
+
+def _get(app, path, query=b""):
+    """Sends a GET through the ASGI app; the client disconnects once the request is read."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query,
+        "root_path": "", "headers": [], "server": ("test", 80), "client": ("test", 1234),
+    }
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+    sent = []
+
+    async def receive():
+        return next(messages, {"type": "http.disconnect"})
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]
+
+def test_client_disconnect_cancels_a_coach_request(monkeypatch):
+    cancelled = []
+
+    async def slow_analysis(*args):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {}
+
+    monkeypatch.setattr(services, "get_full_analysis", slow_analysis)
+    main.app.dependency_overrides[main.get_data_manager] = lambda: None
+    try:
+        start = time.perf_counter()
+        response = _get(main.app, "/v1/user/someone/analysis", b"coach=true")
+        elapsed = time.perf_counter() - start
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response["status"] == 499
+    assert cancelled
+    assert elapsed < 3
+    assert any(name == b"server-timing" for name, _ in response["headers"])
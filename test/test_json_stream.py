@@ -0,0 +1,81 @@
+import io
+import json
+import pytest
+from app.json_stream import ArrayItemParser, iter_object_items
+
+CORPUS = {
+    "weekly-contest-1": {"title": "Weekly Contest 1", "startTime": 1600000000, "questions": [
+        {"title": "Two Sum", "titleSlug": "two-sum", "likes": 12345, "hints": ["a \"quoted\" {hint}"]},
+    ]},
+    "weekly-contest-2": {"title": "Weekly Contest 2", "startTime": 1600604800, "questions": []},
+    "empty": {},
+    "ratio": 0.125,
+}
+
+def _items(text: str, chunk_size: int) -> list:
+    return list(iter_object_items(io.StringIO(text), chunk_size=chunk_size))
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 1 << 16])
+def test_values_spanning_chunk_boundaries(chunk_size):
+    assert _items(json.dumps(CORPUS), chunk_size) == list(CORPUS.items())
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64])
+def test_pretty_printed(chunk_size):
+    assert _items(json.dumps(CORPUS, indent=2), chunk_size) == list(CORPUS.items())
+
+def test_number_ending_at_a_chunk_boundary():
+    text = '{"a":12345,"b":678}'
+    # The first chunk ends inside 12345, the second right after 678.
+    assert text.index("12345") + 3 == 8
+    assert _items(text, 8) == [("a", 12345), ("b", 678)]
+    assert _items('{"a":123}', 8) == [("a", 123)]
+
+@pytest.mark.parametrize("text", ["{}", " { \n } ", "\n{}\n"])
+def test_empty_object(text):
+    assert _items(text, 1) == []
+
+@pytest.mark.parametrize("text", ['{"a": [1, 2', '{"a": 1,', '{"a": 1', '{"a"', '{', '', '[1, 2]'])
+def test_truncated_or_invalid_input(text):
+    with pytest.raises(json.JSONDecodeError):
+        _items(text, 4)
+
+def test_items_before_a_truncation_are_yielded():
+    items = iter_object_items(io.StringIO('{"a": 1, "b": {"c": '), chunk_size=4)
+    assert next(items) == ("a", 1)
+    with pytest.raises(json.JSONDecodeError):
+        next(items)
+
+PLAN = {
+    "introduction": "Focus on {graphs} and \"tries\" [this week].",
+    "focus_areas": [
+        {"topic": "Graph", "reason": "Missed \"BFS\" twice; see {course-schedule} \\ [notes]"},
+        {"topic": "Trie", "reason": "No problems solved yet.", "details": {"priority": 1, "tags": ["a", "b"]}},
+    ],
+    "notes": [{"topic": "not streamed"}],
+    "suggested_problems": [
+        {"slug": "course-schedule", "why": "Classic topological sort }"},
+        {"slug": "implement-trie", "why": "Builds the basics — \\u escapes too"},
+    ],
+}
+
+def _llm_output() -> str:
+    return "Here is your plan:\n```json\n" + json.dumps(PLAN, indent=2, ensure_ascii=False) + "\n```\n"
+
+def _stream(text: str, chunk_size: int) -> list:
+    parser = ArrayItemParser({"focus_areas", "suggested_problems"})
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[i:i + chunk_size]))
+    return items
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 17, 10000])
+def test_array_items_from_chunked_llm_output(chunk_size):
+    expected = [("focus_areas", item) for item in PLAN["focus_areas"]]
+    expected += [("suggested_problems", item) for item in PLAN["suggested_problems"]]
+    assert _stream(_llm_output(), chunk_size) == expected
+
+def test_array_items_are_returned_as_soon_as_complete():
+    parser = ArrayItemParser({"focus_areas"})
+    assert parser.feed('{"focus_areas": [{"topic": "Gra') == []
+    assert parser.feed('ph"}, {"topic"') == [("focus_areas", {"topic": "Graph"})]
+    assert parser.feed(': "Trie"}]}') == [("focus_areas", {"topic": "Trie"})]
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importing_the_app_does_not_load_the_gemini_sdk():
+    env = dict(os.environ, GEMINI_API_KEY="test", DEPLOYED_BASE_URL="http://test",
+               LOCAL_BASE_URL="http://test", USERNAME="test")
+    probe = "import sys, app.main; print('google.generativeai' in sys.modules)"
+    output = subprocess.check_output([sys.executable, "-c", probe], cwd=ROOT, env=env, text=True)
+    assert output.strip() == "False"
@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from app import metrics
+
+def test_timings_and_exposition():
+    token = metrics.start_request()
+    try:
+        with metrics.timer("test.stage"):
+            pass
+        with metrics.timer("test.stage"):
+            pass
+        with pytest.raises(asyncio.TimeoutError):
+            with metrics.upstream_call("test_service", "testQuery"):
+                raise asyncio.TimeoutError()
+        header = metrics.server_timing(0.5)
+    finally:
+        metrics.end_request(token)
+
+    assert header.startswith('test.stage;desc="2 calls";dur=')
+    assert "test_service;dur=" in header
+    assert header.endswith("total;dur=500.0")
+
+    text = metrics.render()
+    assert 'conlit_stage_seconds_count{stage="test.stage"}' in text
+    assert 'conlit_stage_seconds_bucket{stage="test.stage",le="+Inf"}' in text
+    assert 'conlit_upstream_requests_total{operation="testQuery",service="test_service",status="timeout"} 1' in text
+
+def test_timings_outside_a_request_only_feed_histograms():
+    with metrics.timer("test.background"):
+        pass
+    assert metrics.server_timing(0.0) == "total;dur=0.0"
+    assert 'conlit_stage_seconds_count{stage="test.background"} 1' in metrics.render()
@@ -0,0 +1,36 @@
+from app.prompt_builder import build_coaching_prompt, estimate_tokens
+
+TOPIC_GAPS = {
+    "Graph": ["course-schedule", "two-sum", "clone-graph"],
+    "Trie": ["implement-trie", "word-search-ii"],
+}
+NEMESIS = {"two-sum": 2, "word-search-ii": 5, "lru-cache": 3}
+RELATED = {
+    "Array, Hash Table, Sorting": ["two-sum", "3sum", "4sum"],
+    "Design, Linked List, Hash Table": ["lfu-cache"],
+}
+
+def test_compact_and_deduplicated():
+    build = build_coaching_prompt("alice", TOPIC_GAPS, NEMESIS, RELATED, token_budget=10000)
+    assert '"word-search-ii":5,"lru-cache":3,"two-sum":2' in build.text
+    assert '"Array, Hash Table, Sorting":["3sum","4sum"]' in build.text
+    assert '"Graph":["course-schedule","clone-graph"]' in build.text
+    assert '"Trie":["implement-trie"]' in build.text
+    assert build.text.count("two-sum") == 1
+    assert build.estimated_tokens == estimate_tokens(build.text)
+    assert build.sections == {"nemesis_problems": (3, 3), "related_problems": (2, 2), "topic_gaps": (2, 2)}
+
+def test_truncates_to_budget():
+    nemesis = {f"problem-{i}": i for i in range(200)}
+    full = build_coaching_prompt("alice", TOPIC_GAPS, nemesis, RELATED, token_budget=100000)
+    budget = full.estimated_tokens // 2
+    build = build_coaching_prompt("alice", TOPIC_GAPS, nemesis, RELATED, token_budget=budget)
+    assert build.estimated_tokens <= budget
+    kept, total = build.sections["nemesis_problems"]
+    assert 0 < kept < total
+    # The most-attempted problems are kept first.
+    assert '"problem-199":199' in build.text
+    assert '"problem-0":0' not in build.text
+    # Other sections still get a share of the budget.
+    assert build.sections["related_problems"][0] > 0
+    assert build.sections["topic_gaps"][0] > 0
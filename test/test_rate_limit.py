@@ -0,0 +1,69 @@
+import asyncio
+import json
+from app import rate_limit
+from app.rate_limit import BACKGROUND, CRAWL, INTERACTIVE, UpstreamScheduler
+
+def test_interactive_requests_go_first():
+    async def run():
+        scheduler = UpstreamScheduler(rate=20, min_rate=1, max_rate=20, capacity=1)
+        await scheduler.acquire()  # drain the bucket so the others have to queue
+        order = []
+
+        async def request(name, level):
+            with rate_limit.priority(level):
+                await scheduler.acquire()
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(request("crawl", CRAWL))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(request("background", BACKGROUND)))
+        tasks.append(asyncio.ensure_future(request("interactive", INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "background", "crawl"]
+
+def test_state_file_is_shared(tmp_path):
+    path = str(tmp_path / "upstream.state")
+    first = UpstreamScheduler(rate=1, min_rate=1, max_rate=1, capacity=1, state_file=path)
+    second = UpstreamScheduler(rate=1, min_rate=1, max_rate=1, capacity=1, state_file=path)
+    assert first._take(INTERACTIVE) == 0
+    assert second._take(INTERACTIVE) > 0
+
+    asyncio.run(second.on_throttle(30))
+    assert first._take(INTERACTIVE) > 29
+
+def test_successes_are_batched_into_the_next_acquisition(tmp_path):
+    path = tmp_path / "upstream.state"
+    scheduler = UpstreamScheduler(rate=1, min_rate=1, max_rate=5, capacity=10, increase=0.5, state_file=str(path))
+    asyncio.run(scheduler.acquire())
+    written = path.read_text()
+    scheduler.on_success()
+    scheduler.on_success()
+    assert path.read_text() == written
+
+    asyncio.run(scheduler.acquire())
+    assert json.loads(path.read_text())["rate"] == 2.0
+
+def test_shared_bounds_are_not_narrowed_by_another_process(tmp_path):
+    path = str(tmp_path / "upstream.state")
+    api = UpstreamScheduler(rate=7, min_rate=0.5, max_rate=10, capacity=10, state_file=path)
+    crawler = UpstreamScheduler(rate=2, min_rate=0.5, max_rate=2, capacity=2, state_file=path)
+    assert api._take(INTERACTIVE) == 0
+
+    # The crawler's own limits neither lower the shared rate nor cap the bucket.
+    assert crawler._take(CRAWL, increase=0.1) == 0
+    state = json.loads((tmp_path / "upstream.state").read_text())
+    assert state["rate"] == 7.1
+    assert state["capacity"] == 10
+    assert state["tokens"] > 7
+
+    # Crawls leave half of the shared capacity (5 tokens) for interactive requests.
+    for _ in range(3):
+        assert crawler._take(CRAWL) == 0
+    assert crawler._take(CRAWL) > 0
+    assert api._take(INTERACTIVE) == 0
+
+    # A restarted server applies its own settings to the existing file.
+    UpstreamScheduler(rate=4, min_rate=0.5, max_rate=3, capacity=4, state_file=path).claim_bounds()
+    assert api._rate(json.loads((tmp_path / "upstream.state").read_text())) == 3
@@ -0,0 +1,57 @@
+import asyncio
+from app import leetcode_client
+
+def _submission(submission_id, slug, status="Accepted"):
+    return {"id": str(submission_id), "title": slug.title(), "titleSlug": slug,
+            "timestamp": str(submission_id), "statusDisplay": status}
+
+def _serve_pages(monkeypatch, submissions):
+    """Serves `submissions` (newest first) as pages and records the offsets requested."""
+    offsets = []
+
+    async def fetch_page(offset, limit, headers):
+        offsets.append(offset)
+        return submissions[offset:offset + limit], offset + limit < len(submissions)
+
+    monkeypatch.setattr(leetcode_client, "_fetch_submissions_page_with_retry", fetch_page)
+    return offsets
+
+def test_merges_submissions_newer_than_the_high_water_mark(monkeypatch):
+    newer = [_submission(130 - i, f"new-{i % 3}", "Accepted" if i % 2 else "Wrong Answer") for i in range(30)]
+    older = [_submission(100 - i, f"old-{i}") for i in range(30)]
+    offsets = _serve_pages(monkeypatch, newer + older)
+    state = {"latest_id": 100, "latest_timestamp": "100", "slugs": ["old-0", "old-1"]}
+
+    synced = asyncio.run(leetcode_client._sync_solved_state(state, {}))
+
+    assert sorted(synced["slugs"]) == ["new-0", "new-1", "new-2", "old-0", "old-1"]
+    assert synced["latest_id"] == 130
+    assert synced["latest_timestamp"] == "130"
+    # Stops at the first page reaching the old mark instead of walking the whole history.
+    assert offsets == [0, 20]
+
+def test_keeps_the_mark_when_nothing_is_new(monkeypatch):
+    offsets = _serve_pages(monkeypatch, [_submission(100 - i, f"old-{i}") for i in range(30)])
+    state = {"latest_id": 100, "latest_timestamp": "100", "slugs": ["old-0"]}
+
+    synced = asyncio.run(leetcode_client._sync_solved_state(state, {}))
+
+    assert synced == {"latest_id": 100, "latest_timestamp": "100", "slugs": ["old-0"]}
+    assert offsets == [0]
+
+def test_full_fetch_pages_by_submissions_not_questions(monkeypatch):
+    # 300 solved questions, each submitted 10 times: `count` and `submissions` differ.
+    submissions = [_submission(3000 - i, f"q-{i % 300}") for i in range(3000)]
+    offsets = _serve_pages(monkeypatch, submissions)
+    profile = {"submitStats": {
+        "acSubmissionNum": [{"difficulty": "All", "count": 300, "submissions": 3000}],
+        "totalSubmissionNum": [{"difficulty": "All", "count": 300, "submissions": 3000}],
+    }}
+
+    async def get_profile():
+        return profile
+
+    state = asyncio.run(leetcode_client._fetch_solved_state("someone", {}, get_profile))
+
+    assert len(state["slugs"]) == 300
+    assert sorted(offsets) == list(range(0, 3000, 100))
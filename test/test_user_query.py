@@ -0,0 +1,68 @@
+import asyncio
+from app import leetcode_client
+from app.cache import user_cache
+from app.leetcode_client import compose_user_query, section_cache_key, split_user_response
+
+def test_compose_aliases_each_users_sections():
+    query, variables = compose_user_query([("alice", ["profile", "submissions"]), ("bob", ["contest_history"])])
+    assert variables == {"u0": "alice", "u1": "bob"}
+    assert query.startswith("query userData($u0: String!, $u1: String!, $limit: Int!)")
+    assert "u0_matchedUser: matchedUser(username: $u0)" in query
+    assert "u0_recentSubmissionList: recentSubmissionList(username: $u0, limit: $limit)" in query
+    assert "u1_userContestRanking: userContestRanking(username: $u1)" in query
+    assert "u1_userContestRankingHistory: userContestRankingHistory(username: $u1)" in query
+    assert "$USER" not in query
+
+def test_limit_is_only_declared_with_submissions():
+    query, _ = compose_user_query([("alice", ["profile", "contest_history"])])
+    assert "$limit" not in query
+
+def test_split_with_a_missing_user():
+    data = {
+        "u0_matchedUser": {"username": "alice"},
+        "u0_recentSubmissionList": [{"id": "1"}],
+        "u0_userContestRanking": {"rating": 1500},
+        "u0_userContestRankingHistory": [],
+        # LeetCode nulls every field of a user that doesn't exist.
+        "u1_matchedUser": None,
+        "u1_recentSubmissionList": None,
+        "u1_userContestRanking": None,
+        "u1_userContestRankingHistory": None,
+    }
+    sections = ["profile", "submissions", "contest_history"]
+    assert split_user_response(data, 0, sections) == {
+        "profile": {"username": "alice"},
+        "submissions": [{"id": "1"}],
+        "contest_history": {"userContestRanking": {"rating": 1500}, "userContestRankingHistory": []},
+    }
+    assert split_user_response(data, 1, sections) == {
+        "profile": None,
+        "submissions": [],
+        "contest_history": {"userContestRanking": None, "userContestRankingHistory": None},
+    }
+
+def test_get_users_data_only_caches_found_users(monkeypatch):
+    requests = []
+
+    async def post_graphql(payload, headers=None):
+        requests.append(payload)
+        return {"data": {
+            "u0_matchedUser": {"username": "split-alice"}, "u0_recentSubmissionList": [{"id": "1"}],
+            "u1_matchedUser": None, "u1_recentSubmissionList": None,
+        }}
+
+    monkeypatch.setattr(leetcode_client, "_post_graphql", post_graphql)
+    requested = {"split-alice": ["profile", "submissions"], "split-ghost": ["profile", "submissions"]}
+    results = asyncio.run(leetcode_client.get_users_data(requested, limit=5))
+
+    assert results == {
+        "split-alice": {"profile": {"username": "split-alice"}, "submissions": [{"id": "1"}]},
+        "split-ghost": {"profile": None, "submissions": []},
+    }
+    assert requests[0]["variables"] == {"u0": "split-alice", "u1": "split-ghost", "limit": 5}
+    assert user_cache.get("profile", section_cache_key("profile", "split-alice", 5)) == {"username": "split-alice"}
+    assert user_cache.get("profile", section_cache_key("profile", "split-ghost", 5)) is None
+
+    # Cached sections are served without another request.
+    asyncio.run(leetcode_client.get_users_data({"split-alice": ["profile", "submissions"]}, limit=5))
+    assert len(requests) == 1